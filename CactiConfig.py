@@ -0,0 +1,91 @@
+"""
+File:     CactiConfig.py
+Desc:     Structured CACTI config template. A config file is parsed once into
+          typed sweep fields; variants render in memory and only touch disk
+          when explicitly archived with write().
+"""
+
+import hashlib
+
+# (field, first token of the CACTI option, full option label, type)
+FIELDS = [("size",          "-size",          "-size (bytes)",              int),
+          ("line_size",     "-block",         "-block size (bytes)",        int),
+          ("bus_width",     "-output/input",  "-output/input bus width",    int),
+          ("associativity", "-associativity", "-associativity",             int),
+          ("banks",         "-UCA",           "-UCA bank count",            int),
+          ("technode",      "-technology",    "-technology (u)",            float),
+          ("temp",          "-operating",     "-operating temperature (K)", int)]
+
+class CactiConfig:
+
+    def __init__(self, path=None, lines=None, fields=None):
+        """
+        path   - CACTI config file to parse
+        lines  - (internal) template lines shared between variants
+        fields - (internal) typed field values of a variant
+        """
+        if path is not None:
+            self.path = path
+            self.lines = []
+            self.fields = {}
+            fin = open(path, "r")
+            for line in fin:
+                if len(line) >= 3 and line[0] == '/' and line[1] == '/':
+                    continue
+                token = line.split(' ')[0].strip()
+                for name, first, label, typ in FIELDS:
+                    if len(line) >= 3 and token == first:
+                        # keep a placeholder, the value is rendered from self.fields
+                        self.fields[name] = typ(float(line[len(label):].split()[0]))
+                        line = name
+                        break
+                self.lines.append(line)
+            fin.close()
+            assert len(self.fields) == len(FIELDS), "Error obtaining CACTI fields from {}".format(path)
+        else:
+            self.path = None
+            self.lines = lines
+            self.fields = fields
+
+    def __getattr__(self, name):
+        fields = self.__dict__.get("fields", {})
+        if name in fields:
+            return fields[name]
+        raise AttributeError(name)
+
+    def variant(self, **fields):
+        """ New config sharing this template, with some fields replaced """
+        assert set(fields).issubset(self.fields), "Unknown CACTI fields: {}".format(set(fields) - set(self.fields))
+        new_fields = dict(self.fields)
+        for name, first, label, typ in FIELDS:
+            if name in fields:
+                new_fields[name] = typ(fields[name])
+        return CactiConfig(lines=self.lines, fields=new_fields)
+
+    def params(self):
+        """ Sweep parameters (size, line_size, associativity, banks, technode, temp) """
+        return [self.size, self.line_size, self.associativity, self.banks, self.technode, self.temp]
+
+    def fingerprint(self):
+        """
+        Hash of everything but the typed fields (cell and peripheral types, cache type, ...):
+        variants of one template share it, configs of different memory types do not
+        """
+        text = "\n".join(line.strip() for line in self.lines if line not in self.fields and line.strip() != "")
+        return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+    def name(self):
+        """ Sweep-point name, as used for archived configs """
+        return "SRAM_"+str(self.size)+"_"+str(self.line_size)+"_"+str(self.associativity)+"_"+str(self.banks)+"_"+str(self.technode)+"_"+str(self.temp)
+
+    def render(self):
+        """ Config text for CACTI """
+        labels = {name: label for name, first, label, typ in FIELDS}
+        return "".join((labels[line] + " " + str(self.fields[line]) + "\n") if line in self.fields else line for line in self.lines)
+
+    def write(self, path):
+        """ Archive this config to disk """
+        fout = open(path, "w")
+        fout.write(self.render())
+        fout.close()
+        return path
@@ -4,21 +4,26 @@ Author:   Edward Hanson (edward.t.hanson@duke.edu)
 Desc:     Activation, normalization, pooling, control, and peripheral circuits
 """
 
-import configparser as cp
+from SimConfig import load_config
 
 class DigitalSubsys:
 
-    def __init__(self, config_path, MS_dim=1e3, DAC_group_size=1, ADC_group_size=1):
+    def __init__(self, config_path, MS_dim=1e3, DAC_group_size=1, ADC_group_size=1, wdm=1, Nb=8):
         """
         MS_dim         - metasurface input length (i.e., one side of the MS square)
         DAC_group_size - number of MS rows/columns shared by one DAC
         ADC_group_size - number of MS rows/columns shared by one ADC
+        wdm            - number of wavelengths; each needs its own DAC and ADC rows
+        Nb             - precision the DAC/ADC stats are given for
         """
 
-        self.config = cp.ConfigParser()
-        self.config.read(config_path)
+        self.config = load_config(config_path)
         
         self.MS_dim = MS_dim
+        self.DAC_group_size = DAC_group_size
+        self.ADC_group_size = ADC_group_size
+        self.wdm = wdm
+        self.ref_Nb = Nb
 
         # Stats of one DAC
         self.DAC_latency = float(self.config.get("digital", "DAC_latency"))
@@ -35,14 +40,12 @@ class DigitalSubsys:
             self.ADC_avgPower = 0
         self.ADC_area = float(self.config.get("digital", "ADC_area"))
 
-        # Stats of DAC row
+        # Stats of DAC row (one per wavelength, operating in parallel), power is set by set_precision()
         self.DACrow_latency = self.DAC_latency * MS_dim * DAC_group_size
-        self.DACrow_avgPower = self.DAC_avgPower * (MS_dim / DAC_group_size)
-        self.DACrow_area = self.DAC_area * (MS_dim / DAC_group_size)
-        # Stats of one ADC row
+        self.DACrow_area = self.DAC_area * (MS_dim / DAC_group_size) * wdm
+        # Stats of one ADC row (one per wavelength, operating in parallel)
         self.ADCrow_latency = self.ADC_latency * MS_dim * ADC_group_size
-        self.ADCrow_avgPower = self.ADC_avgPower * (MS_dim / ADC_group_size)
-        self.ADCrow_area = self.ADC_area * (MS_dim / ADC_group_size)
+        self.ADCrow_area = self.ADC_area * (MS_dim / ADC_group_size) * wdm
         # Stats of total bit-line selector
         self.bls_latency = float(self.config.get("digital", "bls_latency"))
         if int(self.config.get("general", "en_bls")):
@@ -67,8 +70,19 @@ class DigitalSubsys:
 
         # -------- Summary of DiginalSubsys ------------ #
         self.latency = max([self.DACrow_latency + self.ADCrow_latency, self.bls_latency, self.nonlinear_latency, self.control_latency])
-        self.avgPower = self.DACrow_avgPower + self.ADCrow_avgPower + self.bls_avgPower + self.nonlinear_avgPower + self.control_avgPower
         self.area = self.DACrow_area + self.ADCrow_area + self.bls_area + self.nonlinear_area + self.control_area
+        self.set_precision(Nb)
+
+    def set_precision(self, Nb):
+        """
+        Scale DAC/ADC energy to a new precision (e.g. per layer)
+        Converter energy roughly doubles per extra bit (Walden figure of merit).
+        Latency and area stay at the reference precision.
+        """
+        self.adda_scale = 2.0**(Nb - self.ref_Nb)
+        self.DACrow_avgPower = self.DAC_avgPower * (self.MS_dim / self.DAC_group_size) * self.wdm * self.adda_scale
+        self.ADCrow_avgPower = self.ADC_avgPower * (self.MS_dim / self.ADC_group_size) * self.wdm * self.adda_scale
+        self.avgPower = self.DACrow_avgPower + self.ADCrow_avgPower + self.bls_avgPower + self.nonlinear_avgPower + self.control_avgPower
 
     def update_state(self):
         """
@@ -6,7 +6,9 @@ Desc:     Memory object simulation. Parameters are initialized using integrated
 
 import os
 import subprocess
-import configparser as cp
+from SimConfig import load_config
+from MemSurrogate import get_surrogate
+from CactiConfig import CactiConfig
 
 class MemObj:
 
@@ -15,15 +17,18 @@ class MemObj:
         num_ports      - if only 1 port, assume only read OR write each cycle (rd/wr port)
                        - if 2 ports, assume one read & one write port
         CACTI_path     - path to CACTI root directory
-        config_fname   - name of local config file for this specific memory object
+        config_fname   - name of local config file for this specific memory object,
+                         or an in-memory CactiConfig (never written to disk)
         memstats_fname - name of the CACTI stats output file
         """
 
-        self.config = cp.ConfigParser()
-        self.config.read(config_path)
+        self.config = load_config(config_path)
         
         # These parameters will be initialized using the config file
         self.latency = self.read_energy = self.write_energy = self.static_power = self.area = None
+        # Estimated relative error of each stat, and whether the stats lie outside the sweep data (surrogate backend only)
+        self.error = None
+        self.extrapolated = False
         # Number of ports
         self.num_ports = num_ports
         assert (self.num_ports == 1) or (self.num_ports == 2), "Unsupported port count!"
@@ -32,25 +37,18 @@ class MemObj:
         self.towrite = False
         # Number of ports
         
-        # Run CACTI and send results to local file
+        # Memory characteristics backend: "cacti" (run CACTI) or "surrogate" (interpolate sweep data)
+        self.backend = self.config.get("memory", "backend", fallback="cacti")
         cwd = os.getcwd()
-        with open(os.path.join(cwd, "out", memstats_fname), 'w') as fout:
-            subprocess.run(["./cacti", "-infile", os.path.join(cwd, "mem_cfgs", config_fname)], cwd=CACTI_path, stdout=fout, check=True)
-            fout.close()
-            
-        # Read cacti stats file and import key stats
-        fin = open(os.path.join(cwd, "out", memstats_fname), 'r')
-        for line in fin:
-            if self.latency==None and "Cycle time (ns):" in line:
-                self.latency = float(line.split(':')[1].strip()) * 1e-9
-            elif self.read_energy==None and (("Total dynamic read energy per access (nJ):" in line) or ("Read Energy (nJ):" in line)):
-                self.read_energy = float(line.split(':')[1].strip()) * 1e-9
-            elif self.write_energy==None and (("Total dynamic write energy per access (nJ):" in line) or ("Write Energy (nJ):" in line)):
-                self.write_energy = float(line.split(':')[1].strip()) * 1e-9
-            elif self.static_power==None and (("Total leakage power of a bank (mW):" in line) or ("Leakage Power I/O (mW):" in line)): #("Leakage Power Open Page (mW):" in line):
-                self.static_power = float(line.split(':')[1].strip()) * 1e-3
-            elif "Data array: Area (mm2):" in line:
-                self.area = float(line.split(':')[2].strip())
+        if isinstance(config_fname, CactiConfig):
+            mem_config = config_fname
+        else:
+            mem_config = os.path.join(cwd, "mem_cfgs", config_fname)
+        if self.backend == "surrogate":
+            self.init_surrogate(self.config.get("memory", "surrogate"), mem_config, CACTI_path, os.path.join(cwd, "out", memstats_fname))
+        else:
+            assert self.backend == "cacti", "Unsupported memory backend!"
+            self.init_cacti(CACTI_path, mem_config, os.path.join(cwd, "out", memstats_fname))
 
         assert self.latency != None, "Error obtaining memory latency"
         assert self.read_energy!= None, "Error obtaining memory read energy"
@@ -58,13 +56,79 @@ class MemObj:
         assert self.static_power != None, "Error obtaining memory static power"
         assert self.area != None, "Error obtaining memory area"
 
+        # Stats before config scaling, so apply_scaling() can be redone without CACTI
+        self.raw_stats = (self.read_energy, self.write_energy, self.static_power)
+        self.apply_scaling()
+        
+        #print(self.latency, self.read_energy, self.write_energy, self.static_power, self.area)
+
+    def apply_scaling(self):
+        """
+        Apply leakage_scale and en_buffs from the config to the raw stats
+        """
+        self.read_energy, self.write_energy, self.static_power = self.raw_stats
         leakage_scale = float(self.config.get("memory", "leakage_scale"))
         self.static_power = self.static_power * leakage_scale
 
         if not int(self.config.get("general", "en_buffs")):
             self.read_energy = self.write_energy = self.static_power = 0
-        
-        #print(self.latency, self.read_energy, self.write_energy, self.static_power, self.area)
+
+    def init_cacti(self, CACTI_path, mem_config, memstats_path):
+        """
+        Run CACTI and import key stats from its output
+        mem_config - CACTI config file path, or a CactiConfig piped to CACTI through stdin
+        """
+        if isinstance(mem_config, CactiConfig):
+            result = subprocess.run(["./cacti", "-infile", "/dev/stdin"], cwd=CACTI_path, input=mem_config.render(),
+                                    stdout=subprocess.PIPE, universal_newlines=True, check=True)
+        else:
+            result = subprocess.run(["./cacti", "-infile", mem_config], cwd=CACTI_path,
+                                    stdout=subprocess.PIPE, universal_newlines=True, check=True)
+            # Keep CACTI results in a local file for reference; stats are parsed from memory so
+            # concurrent simulations sharing the file cannot read each other's results
+            with open(memstats_path, 'w') as fout:
+                fout.write(result.stdout)
+        self.parse_cacti(result.stdout.splitlines())
+
+    def parse_cacti(self, lines):
+        """
+        Import key stats from CACTI output lines
+        """
+        for line in lines:
+            if self.latency==None and "Cycle time (ns):" in line:
+                self.latency = float(line.split(':')[1].strip()) * 1e-9
+            elif self.read_energy==None and (("Total dynamic read energy per access (nJ):" in line) or ("Read Energy (nJ):" in line)):
+                self.read_energy = float(line.split(':')[1].strip()) * 1e-9
+            elif self.write_energy==None and (("Total dynamic write energy per access (nJ):" in line) or ("Write Energy (nJ):" in line)):
+                self.write_energy = float(line.split(':')[1].strip()) * 1e-9
+            elif self.static_power==None and (("Total leakage power of a bank (mW):" in line) or ("Leakage Power I/O (mW):" in line)): #("Leakage Power Open Page (mW):" in line):
+                self.static_power = float(line.split(':')[1].strip()) * 1e-3
+            elif "Data array: Area (mm2):" in line:
+                self.area = float(line.split(':')[2].strip())
+
+    def init_surrogate(self, surrogate_path, mem_config, CACTI_path, memstats_path):
+        """
+        Interpolate stats from CACTI sweep data instead of running CACTI.
+        Falls back to CACTI when the sweep data was generated for another memory type.
+        """
+        template = mem_config if isinstance(mem_config, CactiConfig) else CactiConfig(mem_config)
+        surrogate = get_surrogate(surrogate_path)
+        if not surrogate.matches(template.fingerprint()):
+            print("Warn: surrogate sweep data does not cover the memory type of {}, running CACTI".format(template.name()))
+            self.backend = "cacti"
+            self.init_cacti(CACTI_path, mem_config, memstats_path)
+            return
+        params = template.params()
+        stats, self.error, self.extrapolated = surrogate.predict(*params)
+        if self.extrapolated:
+            print("Warn: {} lies outside the surrogate sweep data, stats are extrapolated".format(template.name()))
+        line_size = params[1]
+        self.latency = stats["cycle_time"]
+        # sweep data holds per-byte energies, MemObj uses energy per access
+        self.read_energy = stats["read_energy"] * line_size
+        self.write_energy = stats["write_energy"] * line_size
+        self.static_power = stats["static_power"]
+        self.area = stats["area"]
 
     def update_state(self, toread=False, towrite=False):
         """
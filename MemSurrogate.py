@@ -0,0 +1,111 @@
+"""
+File:     MemSurrogate.py
+Desc:     Interpolating memory-characteristics surrogate built from CACTI sweep data.
+          Predicts cycle time, per-byte read/write energy, static power and area
+          for in-between sweep points without invoking CACTI.
+"""
+
+import os
+import numpy as np
+from SweepStore import SweepStore, PARAMS, STATS, read_summary
+
+# Parameters interpolated in log2 space (powers-of-two design knobs), others are linear
+LOG_PARAMS = ["size", "line_size", "associativity", "banks"]
+
+class MemSurrogate:
+
+    def __init__(self, source, neighbors=8):
+        """
+        source    - sweep store directory or legacy summary.csv
+        neighbors - number of nearest sweep points in each local fit
+        """
+        if os.path.isdir(source):
+            store = SweepStore(source)
+            columns = {name: np.asarray(store[name]) for name in PARAMS + STATS}
+            self.template = store.template
+        else:
+            columns = {name: np.asarray(col, dtype=np.float64) for name, col in read_summary(source).items()}
+            # legacy summaries do not record the memory type
+            self.template = None
+
+        self.neighbors = neighbors
+        # All stats are positive, so fit their logs: relative errors stay comparable across the sweep
+        self.values = np.stack([columns[name] for name in STATS], axis=1)
+        self.targets = np.log(self.values)
+        features = np.stack([self.transform(name, columns[name]) for name in PARAMS], axis=1)
+        # Only parameters the sweep actually varied carry information
+        self.lo = features.min(axis=0)
+        self.hi = features.max(axis=0)
+        self.varied = self.hi > self.lo
+        assert self.varied.any() or len(features) == 1, "Sweep data does not vary any parameter"
+        self.features = self.normalize(features)
+
+    def matches(self, template):
+        """
+        Whether the sweep data was generated from this CACTI template (see CactiConfig.fingerprint()).
+        Stats of other memory types (cell/peripheral type, DRAM vs. SRAM) cannot be predicted.
+        """
+        return self.template is not None and template == self.template
+
+    @staticmethod
+    def transform(name, value):
+        if name in LOG_PARAMS:
+            return np.log2(value)
+        return np.asarray(value, dtype=np.float64)
+
+    def normalize(self, features):
+        """ Scale varied parameters to [0, 1] and drop the rest """
+        return (features[..., self.varied] - self.lo[self.varied]) / (self.hi[self.varied] - self.lo[self.varied])
+
+    def predict(self, size, line_size, associativity, banks, technode, temp):
+        """
+        Returns (stats, error, extrapolated)
+        stats        - dict of STATS (cycle time in s, per-byte energies in J, static power in W, area in mm2)
+        error        - dict of estimated relative error per stat (weighted RMS residual of the local fit),
+                       inf when extrapolated: the sweep data says nothing about the stats there
+        extrapolated - query lies outside the swept range, or differs in a parameter the sweep never varied
+        """
+        query = np.array([self.transform(name, value) for name, value in zip(PARAMS, [size, line_size, associativity, banks, technode, temp])])
+        extrapolated = bool(np.any(query[~self.varied] != self.lo[~self.varied])) or \
+                       bool(np.any(query[self.varied] < self.lo[self.varied]) or np.any(query[self.varied] > self.hi[self.varied]))
+        x = self.normalize(query)
+        if extrapolated:
+            unknown = dict.fromkeys(STATS, float("inf"))
+        else:
+            unknown = None
+
+        dist = np.sqrt(np.sum((self.features - x)**2, axis=1))
+        nearest = np.argsort(dist)[:self.neighbors]
+        if dist[nearest[0]] == 0:
+            # exact sweep point
+            return dict(zip(STATS, self.values[nearest[0]].tolist())), unknown or dict.fromkeys(STATS, 0.0), extrapolated
+
+        # Inverse-distance weighted local linear fit around the query
+        weights = 1 / dist[nearest]
+        design = np.hstack([np.ones((len(nearest), 1)), self.features[nearest] - x])
+        sqrt_w = np.sqrt(weights)[:, None]
+        coeffs = np.linalg.lstsq(design * sqrt_w, self.targets[nearest] * sqrt_w, rcond=None)[0]
+        residuals = self.targets[nearest] - design @ coeffs
+        rms = np.sqrt(np.sum(weights[:, None] * residuals**2, axis=0) / np.sum(weights))
+
+        stats = dict(zip(STATS, np.exp(coeffs[0]).tolist()))
+        error = unknown or dict(zip(STATS, np.expm1(rms).tolist()))
+        return stats, error, extrapolated
+
+# Surrogates are reused by every MemObj pointing at the same sweep data
+_surrogates = {}
+
+def get_surrogate(source):
+    source = os.path.abspath(source)
+    if source not in _surrogates:
+        _surrogates[source] = MemSurrogate(source)
+    return _surrogates[source]
+
+def main():
+    surrogate = get_surrogate("utils/sweep_data/store")
+    for line_size in [64, 100.5, 1000.5, 1500.5]:
+        stats, error, extrapolated = surrogate.predict(67108864, line_size, 2, 1, 0.065, 360)
+        print(line_size, stats, error, extrapolated)
+
+if __name__ == "__main__":
+    main()
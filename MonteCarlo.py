@@ -0,0 +1,167 @@
+"""
+File:     MonteCarlo.py
+Desc:     Monte Carlo sensitivity of energy, latency and TOPS/W to uncertain device
+          parameters. The model is simulated once; every sample is then evaluated at
+          once by feeding NumPy arrays of device stats through layer_energies() with
+          the stored per-layer access counts.
+          Distributions are multiplicative factors on the nominal (configured or
+          CACTI) value: normal:STD, lognormal:SIGMA or uniform:LO:HI
+Usage:    python MonteCarlo.py --param E_adc=lognormal:0.3 --param t=uniform:0.8:1.2 --param leakage_scale=normal:0.2 --samples 10000
+"""
+
+from PhotonicAccelerator import PhotonicAccelerator, read_layers
+from SimConfig import load_config
+import os
+import csv
+import argparse
+import numpy as np
+
+# Uncertain parameter -> accelerator attributes it scales (missing ones, e.g. unused overrides, are skipped)
+PARAMETERS = {"E_adc":         ["E_adc", "digital.ADC_avgPower"],
+              "E_dac":         ["E_dac", "digital.DAC_avgPower"],
+              "t":             ["photonic.t"],
+              "bls_avgPower":  ["digital.bls_avgPower"],
+              "nonlin_avgPower": ["digital.nonlinear_avgPower"],
+              "leakage_scale": ["kernel_buffer.static_power", "object_buffer.static_power"],
+              "read_energy":   ["E_read", "kernel_buffer.read_energy", "object_buffer.read_energy"],
+              "write_energy":  ["E_write", "object_buffer.write_energy"]}
+
+METRICS = ["energy", "latency", "TOPS/W"]
+
+def draw(spec, rng, samples):
+    """ Multiplicative factors for a distribution spec (see module description) """
+    fields = spec.split(':')
+    if fields[0] == "normal":
+        return rng.normal(1.0, float(fields[1]), samples)
+    if fields[0] == "lognormal":
+        return np.exp(rng.normal(0.0, float(fields[1]), samples))
+    if fields[0] == "uniform":
+        return rng.uniform(float(fields[1]), float(fields[2]), samples)
+    raise ValueError("Unsupported distribution: {}".format(spec))
+
+def ranks(values):
+    return np.argsort(np.argsort(values)).astype(np.float64)
+
+def spearman(x, y):
+    """ Spearman rank correlation (no ties expected for continuous samples) """
+    if np.all(y == y[0]):
+        # the metric does not depend on any sampled parameter
+        return 0.0
+    return float(np.corrcoef(ranks(x), ranks(y))[0, 1])
+
+class MonteCarlo:
+
+    def __init__(self, config_path, layers):
+        """
+        config_path - simulation config (file path or ConfigParser)
+        layers      - layer table (see layer_table()), simulated once here
+        """
+        self.acc = PhotonicAccelerator(load_config(config_path))
+        self.layers = layers
+        self.acc.run_layers(layers)
+
+    def targets(self, name):
+        """ (object, attribute) pairs scaled by one parameter """
+        pairs = []
+        for path in PARAMETERS[name]:
+            obj = self.acc
+            *parents, attr = path.split('.')
+            for parent in parents:
+                obj = getattr(obj, parent)
+            if hasattr(obj, attr):
+                pairs.append((obj, attr))
+        return pairs
+
+    def evaluate(self, factors):
+        """
+        factors - {parameter: array of multiplicative factors}, all the same length
+        Returns {metric: array}
+        """
+        acc = self.acc
+        nominal = {}
+        for name, factor in factors.items():
+            for obj, attr in self.targets(name):
+                nominal[(obj, attr)] = getattr(obj, attr)
+                setattr(obj, attr, nominal[(obj, attr)] * factor)
+        nominal[(acc, "critical_path_latency")] = acc.critical_path_latency
+        try:
+            if not int(acc.config.get("general", "cp_override")):
+                acc.critical_path_latency = np.maximum.reduce(np.broadcast_arrays(*acc.critical_path_limits()))
+            energy = 0
+            latency = 0
+            for i in range(len(acc.total_cycle)):
+                # also rescales the DAC/ADC row powers from the sampled unit powers
+                acc.photonic.set_precision(acc.layer_Nb[i])
+                acc.digital.set_precision(acc.layer_Nb[i])
+                total_latency, photonic_energy, digital_energy, DAC_energy, ADC_energy, obj_energy, kern_energy = \
+                    acc.layer_energies(acc.total_cycle[i], acc.total_fft_convs[i], acc.total_obj_fft_convs[i], acc.total_obj_reads[i],
+                                       acc.total_kern_reads[i], acc.total_obj_writes[i])
+                energy = energy + photonic_energy + digital_energy + obj_energy + kern_energy
+                latency = latency + total_latency
+        finally:
+            for (obj, attr), value in nominal.items():
+                setattr(obj, attr, value)
+            acc.photonic.set_precision(acc.Nb)
+            acc.digital.set_precision(acc.Nb)
+        samples = len(next(iter(factors.values())))
+        energy = np.broadcast_to(energy, (samples,))
+        latency = np.broadcast_to(latency, (samples,))
+        return {"energy": energy, "latency": latency, "TOPS/W": sum(acc.total_ops) * 1e-12 / energy}
+
+    def run(self, distributions, samples=1000, seed=0, confidence=0.9):
+        """
+        distributions - {parameter: spec}
+        Returns (factors, metrics, report) where report holds per-metric mean, confidence
+        interval and Spearman rank correlation with every parameter
+        """
+        rng = np.random.default_rng(seed)
+        factors = {name: draw(spec, rng, samples) for name, spec in distributions.items()}
+        metrics = self.evaluate(factors)
+        tail = (1 - confidence) / 2 * 100
+        report = {}
+        for metric, values in metrics.items():
+            report[metric] = {"mean": float(np.mean(values)),
+                              "low": float(np.percentile(values, tail)),
+                              "high": float(np.percentile(values, 100 - tail)),
+                              "sensitivity": {name: spearman(factor, values) for name, factor in factors.items()}}
+        return factors, metrics, report
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo sensitivity to uncertain device parameters")
+    parser.add_argument("--config", type=str, default="default.cfg", help="Simulation configuration file, loaded from acc_cfgs/")
+    parser.add_argument("--param", type=str, action="append", required=True,
+                        help="name=distribution, name in {}".format(", ".join(PARAMETERS)))
+    parser.add_argument("--samples", type=int, default=1000, help="Number of samples")
+    parser.add_argument("--confidence", type=float, default=0.9, help="Confidence interval level")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", type=str, default=None, help="CSV file for every sample")
+    args = parser.parse_args()
+
+    distributions = {}
+    for spec in args.param:
+        name, dist = spec.split('=', 1)
+        assert name in PARAMETERS, "Unsupported parameter: {}".format(name)
+        distributions[name] = dist
+
+    cwd = os.getcwd()
+    config = load_config(os.path.join(cwd, "acc_cfgs", args.config))
+    layers = read_layers(os.path.join(cwd, "model_cfgs", config.get("simulation", "model_cfg")), int(config.get("simulation", "skip_resid")))
+    mc = MonteCarlo(config, layers)
+    nominal = mc.acc.results()
+    factors, metrics, report = mc.run(distributions, args.samples, args.seed, args.confidence)
+
+    print(" --- Monte Carlo: {} samples --- ".format(args.samples))
+    for metric in METRICS:
+        stats = report[metric]
+        print("{}: \tnominal {}, mean {}, {:.0%} CI [{}, {}]".format(metric, nominal[metric], stats["mean"], args.confidence, stats["low"], stats["high"]))
+        for name, rho in sorted(stats["sensitivity"].items(), key=lambda item: -abs(item[1])):
+            print("\t{}: \tSpearman {:+.3f}".format(name, rho))
+
+    if args.output is not None:
+        with open(args.output, 'w', newline='') as fp:
+            write = csv.writer(fp)
+            write.writerow(list(factors) + METRICS)
+            write.writerows(zip(*[factors[name] for name in factors], *[metrics[metric] for metric in METRICS]))
+
+if __name__ == "__main__":
+    main()
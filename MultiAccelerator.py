@@ -0,0 +1,212 @@
+"""
+File:     MultiAccelerator.py
+Desc:     Scale-out model: partition a network across multiple identical photonic
+          accelerators connected by inter-chip links.
+          pipeline - contiguous layer ranges per chip (layer-pipelined)
+          channels - every layer's output channels split across all chips
+Usage:    python MultiAccelerator.py --model YOLOv3.csv --chips 4 --mode pipeline
+          python MultiAccelerator.py --model YOLOv3.csv --mode pipeline --target-fps 60
+"""
+
+from PhotonicAccelerator import PhotonicAccelerator, read_layers
+from SimConfig import load_config
+import os
+import math
+import argparse
+
+MODES = ["pipeline", "channels"]
+
+class MultiAccelerator:
+
+    def __init__(self, config_path, chips=None, mode=None):
+        """
+        chips, mode - override [scaleout] chips/mode from the config
+        """
+        self.config = load_config(config_path)
+        self.chips = chips if chips is not None else int(self.config.get("scaleout", "chips", fallback="1"))
+        self.mode = mode if mode is not None else self.config.get("scaleout", "mode", fallback="pipeline")
+        assert self.chips >= 1, "Need at least one chip!"
+        assert self.mode in MODES, "Unsupported scale-out mode!"
+        # Inter-chip link, per chip
+        self.link_bandwidth = float(self.config.get("scaleout", "link_bandwidth", fallback="25e9")) # bytes/s
+        self.link_energy = float(self.config.get("scaleout", "link_energy", fallback="10e-12"))     # J/byte
+        self.link_latency = float(self.config.get("scaleout", "link_latency", fallback="1e-6"))     # s per transfer
+
+        # All chips are identical, so one accelerator simulates every chip
+        self.acc = PhotonicAccelerator(self.config)
+        self.cache = {}
+
+    def layer_cost(self, layer):
+        """ (latency, energy) of one layer on one chip, simulated once per distinct shape and parameters """
+        key = tuple(sorted((arg, value) for arg, value in layer.items() if arg != "name"))
+        if key not in self.cache:
+            self.acc.reset()
+            self.acc.run_layers([layer])
+            energy = self.acc.photonic_energy[0] + self.acc.digital_energy[0] + self.acc.obj_energy[0] + self.acc.kern_energy[0]
+            self.cache[key] = (self.acc.total_latency[0], energy)
+        return self.cache[key]
+
+    def out_bytes(self, layer):
+        # activations are stored at the layer's photonic precision
+        bytes_per_elem = math.ceil(layer.get("Nb", self.acc.Nb) / 8)
+        return layer["out_obj_size"] * layer["out_channels"] * bytes_per_elem
+
+    def transfer_time(self, nbytes):
+        return self.link_latency + nbytes / self.link_bandwidth if nbytes > 0 else 0
+
+    def idle_power(self):
+        """ Power of a chip with nothing to compute: buffer leakage (none with overridden memory energies) """
+        if int(self.config.get("memory", "mem_override")):
+            return 0
+        return self.acc.kernel_buffer.static_power + self.acc.object_buffer.static_power
+
+    def active_chips(self, layer):
+        """ Chips with work when a layer's output channels (or groups) are split across chips """
+        groups = layer.get("groups", 1)
+        return min(self.chips, groups if groups > 1 else layer["out_channels"])
+
+    def split_layer(self, layer):
+        """ Share of a layer computed by one active chip when output channels are split across chips """
+        split = dict(layer)
+        groups = layer.get("groups", 1)
+        chips = self.active_chips(layer)
+        if groups > 1:
+            # split whole groups, each chip keeps its groups' input channels
+            chip_groups = math.ceil(groups / chips)
+            split["groups"] = chip_groups
+            split["in_channels"] = chip_groups * (layer["in_channels"] // groups)
+            split["out_channels"] = chip_groups * (layer["out_channels"] // groups)
+        else:
+            split["out_channels"] = math.ceil(layer["out_channels"] / chips)
+        return split
+
+    def run(self, layers):
+        """ Simulate a layer table, returns a report dict """
+        if self.mode == "pipeline":
+            return self.run_pipeline(layers)
+        return self.run_channels(layers)
+
+    def run_pipeline(self, layers):
+        costs = [self.layer_cost(layer) for layer in layers]
+        n = len(layers)
+        chips = min(self.chips, n)
+        prefix = [0]
+        for latency, energy in costs:
+            prefix.append(prefix[-1] + latency)
+
+        def stage_time(i, j):
+            # layers [i, j) on one chip, plus sending the last layer's outputs to the next chip
+            send = self.transfer_time(self.out_bytes(layers[j-1])) if j < n else 0
+            return prefix[j] - prefix[i] + send
+
+        # best[k][j]: minimal bottleneck stage time for the first j layers on k chips
+        inf = float("inf")
+        best = [[inf] * (n + 1) for _ in range(chips + 1)]
+        cut = [[0] * (n + 1) for _ in range(chips + 1)]
+        best[0][0] = 0
+        for k in range(1, chips + 1):
+            for j in range(k, n + 1):
+                for i in range(k - 1, j):
+                    t = max(best[k-1][i], stage_time(i, j))
+                    if t < best[k][j]:
+                        best[k][j], cut[k][j] = t, i
+        bounds = [n]
+        for k in range(chips, 0, -1):
+            bounds.append(cut[k][bounds[-1]])
+        bounds = bounds[::-1]
+
+        stages = []
+        for i, j in zip(bounds[:-1], bounds[1:]):
+            traffic = self.out_bytes(layers[j-1]) if j < n else 0
+            stages.append({"layers": [layer["name"] for layer in layers[i:j]],
+                           "compute": prefix[j] - prefix[i],
+                           "transfer": self.transfer_time(traffic),
+                           "link_bytes": traffic})
+        traffic = sum(stage["link_bytes"] for stage in stages)
+        return self.report(stages, chips,
+                           interval=max(stage["compute"] + stage["transfer"] for stage in stages),
+                           fill=sum(stage["compute"] + stage["transfer"] for stage in stages),
+                           energy=sum(energy for latency, energy in costs),
+                           traffic=traffic)
+
+    def run_channels(self, layers):
+        stages = []
+        energy = 0
+        for layer in layers:
+            latency, chip_energy = self.layer_cost(self.split_layer(layer))
+            active = self.active_chips(layer)
+            # all-gather: every chip receives the output channels it did not compute, idle chips all of them
+            receive = self.out_bytes(layer) * ((self.chips - 1) / self.chips if active == self.chips else 1)
+            stages.append({"layers": [layer["name"]],
+                           "chips": active,
+                           "compute": latency,
+                           "transfer": self.transfer_time(receive),
+                           "link_bytes": self.out_bytes(layer) * (self.chips - 1)})
+            # idle chips only leak while the active ones compute
+            energy += chip_energy * active + self.idle_power() * latency * (self.chips - active)
+        latency = sum(stage["compute"] + stage["transfer"] for stage in stages)
+        # every chip works on the same frame, so frames do not overlap
+        return self.report(stages, max(stage["chips"] for stage in stages), interval=latency, fill=latency, energy=energy,
+                           traffic=sum(stage["link_bytes"] for stage in stages))
+
+    def report(self, stages, chips, interval, fill, energy, traffic):
+        """ chips - number of chips actually used (a pipeline never uses more chips than layers) """
+        return {"mode": self.mode,
+                "chips": chips,
+                "throughput": 1 / interval,
+                "fill_latency": fill,
+                "link_bytes": traffic,
+                "link_energy": traffic * self.link_energy,
+                "energy": energy + traffic * self.link_energy,
+                "stages": stages}
+
+def chips_for_fps(config_path, layers, target_fps, mode="pipeline", max_chips=64):
+    """ Smallest chip count reaching target_fps, with its report (None if max_chips is not enough) """
+    base = MultiAccelerator(config_path, chips=1, mode=mode)
+    for chips in range(1, max_chips + 1):
+        base.chips = chips
+        result = base.run(layers)
+        if result["throughput"] >= target_fps:
+            return result
+        if result["chips"] < chips:
+            # every layer already has its own chip
+            break
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition a model across multiple photonic accelerators")
+    parser.add_argument("--config", type=str, default="default.cfg", help="Simulation configuration file, loaded from acc_cfgs/")
+    parser.add_argument("--model", type=str, default=None, help="Model config, loaded from model_cfgs/ (default: from config)")
+    parser.add_argument("--chips", type=int, default=None, help="Number of accelerators (default: [scaleout] chips)")
+    parser.add_argument("--mode", type=str, default=None, choices=MODES, help="Partitioning (default: [scaleout] mode)")
+    parser.add_argument("--target-fps", type=float, default=None, help="Find the smallest chip count reaching this frame rate")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    config_path = os.path.join(cwd, "acc_cfgs", args.config)
+    config = load_config(config_path)
+    model = args.model if args.model is not None else config.get("simulation", "model_cfg")
+    layers = read_layers(os.path.join(cwd, "model_cfgs", model), int(config.get("simulation", "skip_resid")))
+
+    if args.target_fps is not None:
+        result = chips_for_fps(config, layers, args.target_fps, args.mode if args.mode is not None else "pipeline")
+        if result is None:
+            print("Target of {} fps not reachable".format(args.target_fps))
+            return
+    else:
+        result = MultiAccelerator(config, args.chips, args.mode).run(layers)
+
+    print(" --- Scale-out Summary --- ")
+    print("Mode: \t\t\t{}".format(result["mode"]))
+    print("Chips: \t\t\t{}".format(result["chips"]))
+    print("Throughput: \t\t{} fps".format(result["throughput"]))
+    print("Pipeline fill latency: \t{} s".format(result["fill_latency"]))
+    print("Link traffic: \t\t{} bytes/frame".format(result["link_bytes"]))
+    print("Link energy: \t\t{} J/frame".format(result["link_energy"]))
+    print("Total energy: \t\t{} J/frame".format(result["energy"]))
+    if result["mode"] == "pipeline":
+        for i, stage in enumerate(result["stages"]):
+            print("\tChip {}: \t{} layers, compute {} s, transfer {} s".format(i, len(stage["layers"]), stage["compute"], stage["transfer"]))
+
+if __name__ == "__main__":
+    main()
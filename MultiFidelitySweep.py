@@ -0,0 +1,176 @@
+"""
+File:     MultiFidelitySweep.py
+Desc:     Two-stage design sweep over acc_cfgs overrides.
+          screen  - every grid point with the analytic engine, re-evaluated incrementally
+                    (see WhatIf). Buffer stats come from CACTI, run once per distinct buffer
+                    config, or from the memory surrogate when the grid varies buffer configs
+                    that are all of its memory type and lie within its sweep data
+          confirm - only the top-k (or Pareto-optimal) points, with a fresh
+                    PhotonicAccelerator using the configured memory backend and the FSM;
+                    reports how far the screening estimates were off
+Usage:    python MultiFidelitySweep.py --grid memory.mem_access_width=64,128,256 --grid photonic.MS_pix=4e6,9e6 --top-k 3
+          python MultiFidelitySweep.py --grid digital.E_adc=0.6e-12,1.2e-12 --pareto --output out/mf_sweep.csv
+"""
+
+from PhotonicAccelerator import PhotonicAccelerator, read_layers
+from SimConfig import load_config, apply_overrides
+from WhatIf import WhatIf, BUFFER_PARAMS, parse_param
+from MemSurrogate import get_surrogate
+from CactiConfig import CactiConfig
+import os
+import csv
+import itertools
+import argparse
+
+OBJECTIVES = ["energy", "latency", "edp"]
+
+def objective(result, name):
+    if name == "edp":
+        return result["energy"] * result["latency"]
+    return result[name]
+
+def pareto(points):
+    """ Indices of the points no other point beats in both latency and energy """
+    front = []
+    for i, a in enumerate(points):
+        dominated = any(b["latency"] <= a["latency"] and b["energy"] <= a["energy"] and
+                        (b["latency"] < a["latency"] or b["energy"] < a["energy"]) for b in points)
+        if not dominated:
+            front.append(i)
+    return front
+
+def point_overrides(point):
+    """ {(section, option): value} -> {section: {option: value}} """
+    overrides = {}
+    for (section, option), value in point.items():
+        overrides.setdefault(section, {})[option] = value
+    return overrides
+
+class MultiFidelitySweep:
+
+    def __init__(self, config_path, layers, grid):
+        """
+        config_path - base simulation config (file path or ConfigParser)
+        layers      - layer table (see layer_table())
+        grid        - {(section, option): [values]}, swept as a Cartesian product
+        """
+        self.config = load_config(config_path)
+        self.layers = layers
+        self.params = list(grid)
+        self.points = [dict(zip(self.params, values)) for values in itertools.product(*[grid[param] for param in self.params])]
+
+    def surrogate_in_range(self):
+        """
+        Whether the grid varies buffer configs and the memory surrogate covers all of them:
+        every buffer config is of the swept memory type and lies within the sweep data
+        """
+        if not any(param in BUFFER_PARAMS for param in self.params):
+            return False
+        checked = set()
+        for point in self.points:
+            config = apply_overrides(self.config, point_overrides(point))
+            surrogate = get_surrogate(config.get("memory", "surrogate"))
+            for buffer in ["kernel_buffer", "object_buffer"]:
+                key = (config.get("memory", "surrogate"), config.get("memory", buffer))
+                if key in checked:
+                    continue
+                checked.add(key)
+                template = CactiConfig(os.path.join(os.getcwd(), "mem_cfgs", config.get("memory", buffer)))
+                if not surrogate.matches(template.fingerprint()) or surrogate.predict(*template.params())[2]:
+                    return False
+        return True
+
+    def screen(self):
+        """
+        Fast estimate of every grid point, returns one results() dict per point, plus
+        "memory_error" (worst estimated relative error of the buffer stats, 0 from CACTI)
+        and "extrapolated" (buffer stats lie outside the surrogate sweep data)
+        """
+        self.backend = "surrogate" if self.surrogate_in_range() else "cacti"
+        fast = apply_overrides(self.config, {"memory": {"backend": self.backend}, "simulation": {"engine": "analytic"}})
+        whatif = WhatIf(fast, self.layers)
+        estimates = []
+        for point in self.points:
+            for (section, option), value in point.items():
+                whatif.set(section, option, value)
+            estimate = dict(whatif.evaluate())
+            buffers = [whatif.acc.kernel_buffer, whatif.acc.object_buffer]
+            estimate["memory_error"] = max(max(buffer.error.values()) if buffer.error is not None else 0.0 for buffer in buffers)
+            estimate["extrapolated"] = any(buffer.extrapolated for buffer in buffers)
+            estimates.append(estimate)
+        return estimates
+
+    def confirm(self, point):
+        """ Full-fidelity results() of one grid point """
+        overrides = point_overrides(point)
+        overrides.setdefault("simulation", {})["engine"] = "fsm"
+        acc = PhotonicAccelerator(apply_overrides(self.config, overrides))
+        acc.run_layers(self.layers)
+        return acc.results()
+
+    def run(self, top_k=5, use_pareto=False, objective_name="energy"):
+        """
+        Screen all points, then confirm the top_k by objective (or the Pareto set)
+        Returns one row dict per point: params, estimates and, for promoted points, full results and errors
+        """
+        estimates = self.screen()
+        if use_pareto:
+            promoted = pareto(estimates)
+        else:
+            promoted = sorted(range(len(estimates)), key=lambda i: objective(estimates[i], objective_name))[:top_k]
+
+        rows = []
+        for i, (point, estimate) in enumerate(zip(self.points, estimates)):
+            row = {"point": point, "estimate": estimate, "promoted": i in promoted}
+            if row["promoted"]:
+                result = self.confirm(point)
+                row["result"] = result
+                row["error"] = {name: (estimate[name] - result[name]) / result[name] for name in ["latency", "energy", "TOPS/W"]}
+            rows.append(row)
+        return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-fidelity design sweep: screen fast, confirm the best cycle-accurately")
+    parser.add_argument("--config", type=str, default="default.cfg", help="Simulation configuration file, loaded from acc_cfgs/")
+    parser.add_argument("--grid", type=str, action="append", required=True, help="section.option=v1,v2,... (repeat for a Cartesian grid)")
+    parser.add_argument("--top-k", type=int, default=5, help="Number of best screened points to confirm")
+    parser.add_argument("--pareto", action="store_true", help="Confirm the latency/energy Pareto set instead of the top-k")
+    parser.add_argument("--objective", type=str, default="energy", choices=OBJECTIVES, help="Ranking for --top-k")
+    parser.add_argument("--output", type=str, default=None, help="CSV file for every point")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    config = load_config(os.path.join(cwd, "acc_cfgs", args.config))
+    layers = read_layers(os.path.join(cwd, "model_cfgs", config.get("simulation", "model_cfg")), int(config.get("simulation", "skip_resid")))
+    grid = {}
+    for spec in args.grid:
+        param, values = spec.split('=', 1)
+        grid[parse_param(param)] = [value.strip() for value in values.split(',')]
+
+    sweep = MultiFidelitySweep(config, layers, grid)
+    rows = sweep.run(args.top_k, args.pareto, args.objective)
+
+    names = ["{}.{}".format(section, option) for section, option in sweep.params]
+    print(" --- Multi-fidelity sweep: {} points screened, {} confirmed --- ".format(len(rows), sum(row["promoted"] for row in rows)))
+    print("Screening buffer stats: \t{}, worst estimated error {:.2%}, {} points extrapolated".format(
+        sweep.backend, max(row["estimate"]["memory_error"] for row in rows), sum(row["estimate"]["extrapolated"] for row in rows)))
+    for row in rows:
+        if row["promoted"]:
+            print("{}: \tlatency {} s ({:+.2%}), energy {} J ({:+.2%})".format(
+                ", ".join("{}={}".format(name, value) for name, value in zip(names, row["point"].values())),
+                row["result"]["latency"], row["error"]["latency"], row["result"]["energy"], row["error"]["energy"]))
+    confirmed = [row for row in rows if row["promoted"]]
+    print("Max screening error: \tlatency {:.2%}, energy {:.2%}".format(max(abs(row["error"]["latency"]) for row in confirmed),
+                                                                        max(abs(row["error"]["energy"]) for row in confirmed)))
+
+    if args.output is not None:
+        with open(args.output, 'w', newline='') as fp:
+            write = csv.writer(fp)
+            write.writerow(names + ["Est. latency (s)", "Est. energy (J)", "Est. memory error", "Extrapolated", "Promoted", "Latency (s)", "Energy (J)", "Latency error", "Energy error"])
+            for row in rows:
+                full = [row["result"]["latency"], row["result"]["energy"], row["error"]["latency"], row["error"]["energy"]] if row["promoted"] else [""] * 4
+                write.writerow(list(row["point"].values()) + [row["estimate"]["latency"], row["estimate"]["energy"], row["estimate"]["memory_error"],
+                                                   int(row["estimate"]["extrapolated"]), int(row["promoted"])] + full)
+
+if __name__ == "__main__":
+    main()
@@ -7,27 +7,29 @@ Desc:     Complete description of photonic accelerator system
 from PhotonicSubsys import PhotonicSubsys
 from DigitalSubsys import DigitalSubsys
 from MemObj import MemObj
+from SimConfig import load_config
+from Roofline import Roofline
+from TraceWriter import TraceWriter
+import os
 import math
 import numpy as np
-import configparser as cp
 import csv
 
 class PhotonicAccelerator:
 
     def __init__(self, config_path):
         """
+        config_path - simulation config file, or a ConfigParser (see SimConfig)
         - Compute critical path latency and total area
         - Compute cycle-accurate energy costs
         - Implement flexible memory subsystem with optional FIFO buffer
         - Implement control flow (FSM)
         """
 
-        self.config = cp.ConfigParser()
-        self.config.read(config_path)
+        self.config = load_config(config_path)
         
         # Constants
-        self.MS_pix = float(self.config.get("photonic", "MS_pix"))
-        self.MS_dim = math.floor(math.sqrt(self.MS_pix))
+        self.init_geometry()
 
         # Default layer stats
         self.in_obj_size = 1024
@@ -38,6 +40,15 @@ class PhotonicAccelerator:
         self.stride = 1
         self.channels_per_map = max(1, min(self.MS_pix // self.in_obj_size, self.MS_pix // self.kernel_size))
         self.filters_per_map = 1 
+        self.groups = 1
+        # Weight sparsity (see load_layer): fraction of kernel words read per exposure
+        self.density = 1.0
+        self.structure = "unstructured"
+        self.kern_density = 1
+        # FSM loop bounds and output maps written per convolution (see load_layer)
+        self.in_limit = self.in_channels
+        self.out_limit = self.out_channels
+        self.maps_per_exposure = 1
         
         # Registers for Finite-state-machine
         self.cycle = 0
@@ -52,25 +63,66 @@ class PhotonicAccelerator:
         self.kern_reads = 0
         self.obj_writes = 0
         self.fft_convs = 0
+        # object FFTs (state 2) among fft_convs: the object path uses a single wavelength
+        self.obj_fft_convs = 0
         self.ops = 0
 
+        # Layer evaluation engine: "fsm" (cycle-accurate) or "analytic" (closed-form)
+        self.engine = self.config.get("simulation", "engine", fallback="fsm")
+        assert self.engine in ("fsm", "analytic"), "Unsupported engine!"
+
         # Instantiate memory subsys
+        self.init_buffers()
+        self.init_memory()
+        # Instantiate digital subsys
+        self.init_digital()
+        # Instantiate photonic subsys
+        self.init_photonic()
+
+        # Determine critical path latency
+        self.init_critical_path()
+
+        # Per-layer traces streamed as layers finish (opened on the first layer after reset())
+        self.stream_output = self.config.get("simulation", "stream_output", fallback="")
+        self.stream_binary = int(self.config.get("simulation", "stream_binary", fallback="0"))
+        self.trace_writer = None
+        
+        self.reset()
+
+    # Each init_* step (re)derives its stats from the config, see WhatIf for their dependencies
+
+    def init_geometry(self):
+        """ MS size, WDM degree and default precision """
+        self.MS_pix = float(self.config.get("photonic", "MS_pix"))
+        self.MS_dim = math.floor(math.sqrt(self.MS_pix))
+        # Wavelengths sharing the MS: convolutions performed concurrently per exposure
+        self.wdm = int(self.config.get("photonic", "wdm", fallback="1"))
+        # Default precision, layers may override it (see load_layer)
+        self.Nb = float(self.config.get("photonic", "Nb"))
+
+    def init_buffers(self):
+        """ Kernel and object buffers (runs CACTI) """
         cacti_dir = self.config.get("simulation", "cacti")
         kernel_cfg = self.config.get("memory", "kernel_buffer")
         object_cfg = self.config.get("memory", "object_buffer")
         kernel_ports = float(self.config.get("memory", "kernel_ports"))
         object_ports = float(self.config.get("memory", "object_ports"))
-        self.kernel_buffer = MemObj(config_path, kernel_ports, cacti_dir, kernel_cfg)
-        self.object_buffer = MemObj(config_path, object_ports, cacti_dir, object_cfg)
+        self.kernel_buffer = MemObj(self.config, kernel_ports, cacti_dir, kernel_cfg)
+        self.object_buffer = MemObj(self.config, object_ports, cacti_dir, object_cfg)
+
+    def init_memory(self):
+        """ Buffer access width, banking and unit energy overrides """
         self.mem_access_width = float(self.config.get("memory", "mem_access_width"))
         self.banks = float(self.config.get("memory", "banks"))
         if int(self.config.get("memory", "mem_override")):
             self.E_read = float(self.config.get("memory", "E_read"))
             self.E_write = float(self.config.get("memory", "E_write"))
-        # Instantiate digital subsys
+
+    def init_digital(self):
+        """ Digital subsystem and DAC/ADC unit energy overrides """
         DAC_group_size = float(self.config.get("digital", "DAC_group_size"))
         ADC_group_size = float(self.config.get("digital", "ADC_group_size"))
-        self.digital = DigitalSubsys(config_path, MS_dim=self.MS_dim, DAC_group_size=DAC_group_size, ADC_group_size=ADC_group_size)
+        self.digital = DigitalSubsys(self.config, MS_dim=self.MS_dim, DAC_group_size=DAC_group_size, ADC_group_size=ADC_group_size, wdm=self.wdm, Nb=self.Nb)
         if int(self.config.get("digital", "adda_override")):
             if int(self.config.get("general", "en_ADC")):
                 self.E_adc = float(self.config.get("digital", "E_adc"))
@@ -80,37 +132,51 @@ class PhotonicAccelerator:
                 self.E_dac = float(self.config.get("digital", "E_dac"))
             else:
                 self.E_dac = 0
-        # Instantiate photonic subsys
-        Nb = float(self.config.get("photonic", "Nb"))
-        self.photonic = PhotonicSubsys(config_path, MS_pix=self.MS_pix, Nb=Nb)
 
-        # Determine critical path latency
+    def init_photonic(self):
+        self.photonic = PhotonicSubsys(self.config, MS_pix=self.MS_pix, Nb=self.Nb)
+
+    def critical_path_limits(self):
+        """
+        Latencies bounding the critical path (unless overridden): photonic, digital and,
+        without FIFO buffering, kernel and object buffer (stats may be sample arrays, see MonteCarlo)
+        """
+        limits = [self.photonic.t, self.digital.latency]
+        if not int(self.config.get("general", "FIFO")):
+            # every exposure loads a kernel per wavelength, but the object only once
+            limits += [self.kernel_buffer.latency*self.MS_pix*self.wdm/self.mem_access_width/self.banks,
+                       self.object_buffer.latency*self.MS_pix/self.mem_access_width/self.banks]
+        return limits
+
+    def init_critical_path(self):
         if int(self.config.get("general", "cp_override")):
             self.critical_path_latency = float(self.config.get("general", "critical_path"))
             print("Critical path overriden to {}".format(float(self.config.get("general", "critical_path"))))
         elif int(self.config.get("general", "FIFO")):
-            self.critical_path_latency = max(self.photonic.t,
-                                             self.digital.latency)
+            self.critical_path_latency = max(self.critical_path_limits())
             if self.photonic.t > self.digital.latency:
                 print("Critical path restricted to {} due to photonic subsystem".format(self.photonic.t))
             else:
                 print("Critical path restricted to {} due to digital subsystem".format(self.digital.latency))
                 print("ADC: {}, DAC: {}".format(self.digital.ADCrow_latency, self.digital.DACrow_latency))
         else:
-            self.critical_path_latency = max(self.photonic.t,
-                                             self.digital.latency,
-                                             self.kernel_buffer.latency*self.MS_pix/self.mem_access_width/self.banks,
-                                             self.object_buffer.latency*self.MS_pix/self.mem_access_width/self.banks)
-            if self.critical_path_latency == self.photonic.t:
+            photonic_limit, digital_limit, kernel_limit, object_limit = self.critical_path_limits()
+            self.critical_path_latency = max(photonic_limit, digital_limit, kernel_limit, object_limit)
+            if self.critical_path_latency == photonic_limit:
                 print("Critical path restricted to {} due to photonic subsystem".format(self.photonic.t))
-            elif self.critical_path_latency == self.digital.latency:
+            elif self.critical_path_latency == digital_limit:
                 print("Critical path restricted to {} due to digital subsystem".format(self.digital.latency))
-            elif self.critical_path_latency == self.kernel_buffer.latency*self.MS_pix/self.mem_access_width/self.banks:
-                print("Critical path restricted to {} due to kernel buffer (influenced by MS size)".format(self.kernel_buffer.latency*self.MS_pix/self.mem_access_width/self.banks))
+            elif self.critical_path_latency == kernel_limit:
+                print("Critical path restricted to {} due to kernel buffer (influenced by MS size and WDM)".format(kernel_limit))
             else:
-                print("Critical path restricted to {} due to object buffer (incluenced by MS size)".format(self.object_buffer.latency*self.MS_pix/self.mem_access_width/self.banks))
+                print("Critical path restricted to {} due to object buffer (incluenced by MS size)".format(object_limit))
         #print("Critical path = {}".format(self.critical_path_latency))
-        
+
+    def reset(self):
+        """ Clear lifetime summary variables so the accelerator can be reused for another model """
+        self.state = 0
+        self.done = True
+        self.close_traces()
         # Lifetime summary variables
         self.total_latency = []
         self.total_cycle = []
@@ -121,42 +187,171 @@ class PhotonicAccelerator:
         self.obj_energy = []
         self.kern_energy = []
         self.total_fft_convs = []
+        self.total_obj_fft_convs = []
         self.total_ops = []
         self.layerwise_MS_util = []
         self.total_obj_reads = []
         self.total_kern_reads = []
         self.total_obj_writes = []
+        self.layer_Nb = []
         # buffer width inefficiency
         self.obj_inef = []
         self.obj_write_inef = []
         self.kern_inef = []
-        
-    def load_layer(self, in_obj_size, out_obj_size, in_channels, out_channels, kernel_size, stride):
+
+    def load_layer(self, in_obj_size, out_obj_size, in_channels, out_channels, kernel_size, stride, groups=1, Nb=None, min_Nb=None,
+                   density=1.0, structure="unstructured"):
+        """
+        groups    - grouped convolution: each filter sees in_channels/groups channels.
+                    groups == in_channels is a depthwise convolution.
+        Nb        - precision of this layer (default: [photonic] Nb)
+        min_Nb    - lowest precision this layer tolerates (see precision_search)
+        density   - fraction of nonzero weights
+        structure - where the zeros are (see SPARSITY_STRUCTURES):
+                    filter       - whole filters are zero: skipped, no exposure, kernel read or write
+                    block        - zero blocks of one filter over the channels sharing an exposure: skipped
+                                   like filters (this dataflow streams every filter once per input pass)
+                    unstructured - scattered zeros: every exposure still runs, but kernels are read
+                                   compressed (nonzero weights plus a 1 bit/weight bitmap)
+        """
+        assert in_channels % groups == 0 and out_channels % groups == 0, "Channels must be divisible by groups!"
+        assert 0 < density <= 1, "Density must be in (0, 1]!"
+        assert structure in SPARSITY_STRUCTURES, "Unsupported sparsity structure!"
+        if Nb is None:
+            Nb = self.Nb
+        assert min_Nb is None or Nb >= min_Nb, "Layer precision below its minimum!"
+        # optical energy and DAC/ADC costs follow the layer precision
+        self.photonic.set_precision(Nb)
+        self.digital.set_precision(Nb)
         self.in_obj_size = in_obj_size
         self.out_obj_size = out_obj_size
         self.in_channels = in_channels
         self.out_channels = out_channels
         self.kernel_size = kernel_size
         self.stride = stride
+        self.groups = groups
+        self.density = density
+        self.structure = structure
+        group_in_channels = in_channels // groups
+        group_out_channels = out_channels // groups
+        if density < 1 and structure != "unstructured":
+            # only nonzero filters (blocks) of each group are ever exposed (tolerate float round-off in the product)
+            kept_out_channels = max(1, math.ceil(group_out_channels * density - 1e-9))
+            self.kern_density = 1
+        else:
+            kept_out_channels = group_out_channels
+            self.kern_density = min(1, density + 1 / Nb) if density < 1 else 1
         
         self.channels_per_map = max(1, min(min(self.MS_pix // in_obj_size, self.MS_pix // kernel_size), self.in_channels))
         # prefer to limit 1 filter at a time --> directly accumulate partial sums
-        self.filters_per_map = 1
+        # with WDM, each wavelength carries a different filter over the same channels
+        self.filters_per_map = max(1, min(self.wdm, kept_out_channels))
+
+        if groups == 1:
+            # dense: every filter accumulates over all input channels
+            self.in_limit = self.in_channels
+            self.out_limit = kept_out_channels
+            self.maps_per_exposure = self.filters_per_map
+        elif group_in_channels == 1:
+            # depthwise: pack many channels per MS, each with its own filter(s),
+            # so every convolution produces one output map per packed channel
+            self.in_limit = self.in_channels
+            self.out_limit = kept_out_channels
+            self.maps_per_exposure = self.channels_per_map * self.filters_per_map
+        else:
+            # grouped: never mix groups on one MS, iterate over groups one after another
+            self.channels_per_map = min(self.channels_per_map, group_in_channels)
+            self.in_limit = groups * math.ceil(group_in_channels / self.channels_per_map) * self.channels_per_map
+            self.out_limit = kept_out_channels
+            self.maps_per_exposure = self.filters_per_map
 
         # we can directly count the number of OPs (MACs * 2) here
-        window_ops = self.kernel_size * self.in_channels * self.out_channels * 2
+        # (dense-equivalent: skipped zero weights still count as work done)
+        window_ops = self.kernel_size * group_in_channels * self.out_channels * 2
         self.ops = window_ops * self.out_obj_size
 
         return
 
-    def compute_stats(self):
-        total_latency = self.critical_path_latency * self.cycle
-        photonic_energy = self.fft_convs * self.photonic.E
+    def run_layers(self, layers):
+        """
+        Simulate every layer of a layer table (see layer_table())
+        Returns the number of FSM iterations per layer
+        """
+        iters = []
+        for layer in layers:
+            self.load_layer(**{arg: value for arg, value in layer.items() if arg != "name"})
+            iters.append(self.simulate_layer())
+        return iters
+
+    def simulate_layer(self):
+        """
+        Run the loaded layer to completion with the configured engine
+        Returns the number of FSM iterations
+        """
+        if self.engine == "analytic":
+            return self.simulate_analytic()
+        return self.simulate_fsm()
+
+    def simulate_fsm(self):
+        """ Update and apply FSM state until 'done' signal is reached """
+        self.update_state(True)
+        cycle = 0
+        while not self.done:
+            self.apply_latch()
+            self.update_state()
+            cycle += 1
+        return cycle
+
+    def simulate_analytic(self):
+        """
+        Closed-form equivalent of simulate_fsm()
+        Leaves every counter, register and lifetime list exactly as the FSM would.
+        Assumes read_ready is held high for the whole layer (no wait states).
+        """
+        assert self.read_ready, "Analytic engine requires read_ready"
+
+        # number of passes through states 2 and 4
+        in_passes = max(1, int(-(-self.in_limit // self.channels_per_map)))
+        out_passes = max(1, int(-(-self.out_limit // self.filters_per_map)))
+
+        obj_size = float(self.in_obj_size*self.channels_per_map) / self.mem_access_width
+        kern_size = float(self.kernel_size*self.channels_per_map*self.filters_per_map*self.kern_density) / self.mem_access_width
+        write_size = float(self.out_obj_size*self.maps_per_exposure) / self.mem_access_width
+
+        # state 1 once, (state 2 + state 4 * out_passes) per input pass, states 5-8
+        self.obj_reads = math.ceil(obj_size) * (1 + in_passes)
+        self.kern_reads = math.ceil(kern_size) * in_passes * out_passes
+        self.obj_writes = math.ceil(write_size) * in_passes * out_passes
+        self.fft_convs = in_passes * (2 + 2*out_passes)
+        self.obj_fft_convs = in_passes * 2
+        self.cycle = 1 + in_passes * (1 + 4*out_passes) + 4
+        self.obj_inef.extend([float(math.ceil(obj_size)) / obj_size] * (1 + in_passes))
+        self.kern_inef.extend([float(math.ceil(kern_size)) / kern_size] * (in_passes * out_passes))
+        self.obj_write_inef.extend([float(math.ceil(write_size)) / write_size] * (in_passes * out_passes))
+        self.curr_in_channel = in_passes * self.channels_per_map
+        self.curr_out_channel = out_passes * self.filters_per_map
+        self.compute_stats()
+
+        # final latch in state 0
+        self.cycle += 1
+        self.state = 0
+        self.start = False
+        self.done = True
+        return 1 + in_passes * (1 + out_passes) + 4 + 1
+
+    def layer_energies(self, cycle, fft_convs, obj_fft_convs, obj_reads, kern_reads, obj_writes):
+        """
+        Latency and energies of one layer from its counters, at the current precision
+        Returns (latency, photonic, digital, DAC, ADC, object buffer, kernel buffer energy)
+        """
+        total_latency = self.critical_path_latency * cycle
+        # object FFTs only light one wavelength, kernel convolutions all wdm of them
+        photonic_energy = fft_convs * self.photonic.E - obj_fft_convs * (self.photonic.E - self.photonic.E_single)
 
         if int(self.config.get("digital", "adda_override")):
             digital_energy = total_latency * (self.digital.bls_avgPower + self.digital.nonlinear_avgPower + self.digital.control_avgPower)
-            DAC_energy = (self.obj_reads + (self.kern_reads*2)) * self.mem_access_width * self.E_dac
-            ADC_energy = (self.obj_writes*2) * self.mem_access_width * self.E_adc
+            DAC_energy = (obj_reads + (kern_reads*2)) * self.mem_access_width * self.E_dac * self.digital.adda_scale
+            ADC_energy = (obj_writes*2) * self.mem_access_width * self.E_adc * self.digital.adda_scale
             digital_energy += (DAC_energy + ADC_energy)
         else:
             digital_energy = total_latency * self.digital.avgPower
@@ -164,12 +359,18 @@ class PhotonicAccelerator:
             ADC_energy = total_latency * self.digital.ADCrow_avgPower
 
         if int(self.config.get("memory", "mem_override")):
-            obj_energy = (self.obj_reads * self.mem_access_width * self.E_read) + (self.obj_writes * self.mem_access_width * self.E_write)
-            kern_energy = self.kern_reads * self.mem_access_width * self.E_read
+            obj_energy = (obj_reads * self.mem_access_width * self.E_read) + (obj_writes * self.mem_access_width * self.E_write)
+            kern_energy = kern_reads * self.mem_access_width * self.E_read
         else:
-            obj_energy = (self.obj_reads * self.object_buffer.read_energy) + (self.obj_writes * self.object_buffer.write_energy) + (total_latency * self.object_buffer.static_power)
-            kern_energy = (self.kern_reads * self.kernel_buffer.read_energy) + (total_latency * self.kernel_buffer.static_power)
-            
+            obj_energy = (obj_reads * self.object_buffer.read_energy) + (obj_writes * self.object_buffer.write_energy) + (total_latency * self.object_buffer.static_power)
+            kern_energy = (kern_reads * self.kernel_buffer.read_energy) + (total_latency * self.kernel_buffer.static_power)
+
+        return total_latency, photonic_energy, digital_energy, DAC_energy, ADC_energy, obj_energy, kern_energy
+
+    def compute_stats(self):
+        total_latency, photonic_energy, digital_energy, DAC_energy, ADC_energy, obj_energy, kern_energy = \
+            self.layer_energies(self.cycle, self.fft_convs, self.obj_fft_convs, self.obj_reads, self.kern_reads, self.obj_writes)
+
         self.total_latency.append(total_latency)
         self.total_cycle.append(self.cycle)
         self.photonic_energy.append(photonic_energy)
@@ -179,11 +380,17 @@ class PhotonicAccelerator:
         self.obj_energy.append(obj_energy)
         self.kern_energy.append(kern_energy)
         self.total_fft_convs.append(self.fft_convs)
+        self.total_obj_fft_convs.append(self.obj_fft_convs)
         self.total_ops.append(self.ops)
         self.layerwise_MS_util.append(float(self.in_obj_size * self.channels_per_map) / self.MS_pix)
         self.total_obj_reads.append(self.obj_reads)
         self.total_kern_reads.append(self.kern_reads)
         self.total_obj_writes.append(self.obj_writes)
+        self.layer_Nb.append(self.photonic.Nb)
+        if self.stream_output:
+            if self.trace_writer is None:
+                self.trace_writer = TraceWriter(self.stream_output, self.stream_binary)
+            self.trace_writer.write_layer(self)
         
         if int(self.config.get("simulation", "dump_layerwise")):
             print("Total latency \t\t= {}".format(total_latency))
@@ -198,38 +405,88 @@ class PhotonicAccelerator:
         
         return
 
+    def close_traces(self):
+        """ Finish the streamed traces, if any """
+        if self.trace_writer is not None:
+            self.trace_writer.close()
+            self.trace_writer = None
+
+    def results(self):
+        """ Lifetime totals as a dict """
+        total_energy = sum(self.photonic_energy) + sum(self.digital_energy) + sum(self.obj_energy) + sum(self.kern_energy)
+        scaled_util = [self.layerwise_MS_util[i]*self.total_fft_convs[i] / sum(self.total_fft_convs) for i in range(len(self.layerwise_MS_util))]
+        return {"layers": len(self.total_latency),
+                "latency": sum(self.total_latency),
+                "cycles": sum(self.total_cycle),
+                "energy": total_energy,
+                "photonic_energy": sum(self.photonic_energy),
+                "digital_energy": sum(self.digital_energy),
+                "DAC_energy": sum(self.DAC_energy),
+                "ADC_energy": sum(self.ADC_energy),
+                "obj_energy": sum(self.obj_energy),
+                "kern_energy": sum(self.kern_energy),
+                "obj_read_inef": sum(self.obj_inef) / len(self.obj_inef),
+                "obj_write_inef": sum(self.obj_write_inef) / len(self.obj_write_inef),
+                "kern_read_inef": sum(self.kern_inef) / len(self.kern_inef),
+                "avg_power": total_energy / sum(self.total_latency),
+                "imgs_per_J": 1 / total_energy,
+                "avg_util": sum(scaled_util),
+                "ops": sum(self.total_ops),
+                "TOPS": sum(self.total_ops) * 1e-12 / sum(self.total_latency),
+                "TOPS/W": sum(self.total_ops) * 1e-12 / total_energy}
+
     def summary(self):
         """ Print lifetime summary """
+        r = self.results()
+        total_energy = r["energy"]
         print(" --- Total Summary --- ")
-        print("CNN latency: \t\t{} s".format(sum(self.total_latency)))
-        print("CNN cycle count: \t{}".format(sum(self.total_cycle)))
-        total_energy = sum(self.photonic_energy) + sum(self.digital_energy) + sum(self.obj_energy) + sum(self.kern_energy)
+        print("CNN latency: \t\t{} s".format(r["latency"]))
+        print("CNN cycle count: \t{}".format(r["cycles"]))
         print("Total energy: \t\t{} J".format(total_energy))
-        print("\tPhotonic: \t{:%}".format(sum(self.photonic_energy) / total_energy))
-        print("\tDigital: \t{:%}".format(sum(self.digital_energy) / total_energy))
-        print("\t-->DAC: \t{:%}".format(sum(self.DAC_energy) / total_energy))
-        print("\t-->ADC: \t{:%}".format(sum(self.ADC_energy) / total_energy))
-        print("\tObj buffer: \t{:%}\tRead inefficiency: \t{}\tWrite ineffciency: \t{}".format(sum(self.obj_energy) / total_energy, sum(self.obj_inef) / len(self.obj_inef), sum(self.obj_write_inef) / len(self.obj_write_inef)))
-        print("\tKern buffer: \t{:%}\tRead inefficiency: \t{}".format(sum(self.kern_energy) / total_energy, sum(self.kern_inef) / len(self.kern_inef)))
-        print("Average power: \t\t{} W".format(total_energy / sum(self.total_latency)))
-        print("Energy efficiency: \t{} imgs/J".format(1 / total_energy))
+        print("\tPhotonic: \t{:%}".format(r["photonic_energy"] / total_energy))
+        print("\tDigital: \t{:%}".format(r["digital_energy"] / total_energy))
+        print("\t-->DAC: \t{:%}".format(r["DAC_energy"] / total_energy))
+        print("\t-->ADC: \t{:%}".format(r["ADC_energy"] / total_energy))
+        print("\tObj buffer: \t{:%}\tRead inefficiency: \t{}\tWrite ineffciency: \t{}".format(r["obj_energy"] / total_energy, r["obj_read_inef"], r["obj_write_inef"]))
+        print("\tKern buffer: \t{:%}\tRead inefficiency: \t{}".format(r["kern_energy"] / total_energy, r["kern_read_inef"]))
+        print("Average power: \t\t{} W".format(r["avg_power"]))
+        print("Energy efficiency: \t{} imgs/J".format(r["imgs_per_J"]))
 
-        scaled_util = [self.layerwise_MS_util[i]*self.total_fft_convs[i] / sum(self.total_fft_convs) for i in range(len(self.layerwise_MS_util))]
-        print("Avg utilization: {}".format(sum(scaled_util)))
-        print("OP: {}".format(sum(self.total_ops)))
-        print("TOPS: {}".format(sum(self.total_ops) * 1e-12 / sum(self.total_latency)))
-        print("TOPS/W: {}".format(sum(self.total_ops) * 1e-12 / total_energy))
+        print("Avg utilization: {}".format(r["avg_util"]))
+        print("OP: {}".format(r["ops"]))
+        print("TOPS: {}".format(r["TOPS"]))
+        print("TOPS/W: {}".format(r["TOPS/W"]))
+        roofline = Roofline(self)
+        print("Bottleneck: {} bound".format(roofline.model()["bound"]))
         print(" --------------------- ")
 
+        # Save all traces
+        output_file = self.config.get("simulation", "output")
+        data = self.traces()
+
+        fp = open(output_file, 'w', newline ='')
+        with fp:    
+            write = csv.writer(fp)
+            write.writerows(data)
+        fp.close()
+        self.close_traces()
+        # Per-layer bottleneck report next to the traces
+        roofline.write(self.config.get("simulation", "roofline_output", fallback=os.path.splitext(output_file)[0] + "_roofline.csv"))
+        
+        return self.total_cycle
+
+    def traces(self):
+        """ Per-layer traces, one row per stat, as saved by summary() """
+        scaled_util = [self.layerwise_MS_util[i]*self.total_fft_convs[i] / sum(self.total_fft_convs) for i in range(len(self.layerwise_MS_util))]
         total_energies = np.sum([self.photonic_energy, self.digital_energy, self.obj_energy, self.kern_energy], axis=0)
         total_TOPS = list(list(np.array(self.total_ops) * 1e-12) / np.array(self.total_latency))
-        total_TOPSW = list(list(np.array(self.total_ops) * 1e-12) / np.array(self.total_latency))
+        total_TOPSW = list(list(np.array(self.total_ops) * 1e-12) / total_energies)
         accumulated = []
-        for i in range(len(self.total_latency)):
-            accumulated.append(sum(self.total_latency[:i+1]))
+        running = 0
+        for latency in self.total_latency:
+            running += latency
+            accumulated.append(running)
 
-        # Save all traces    
-        output_file = self.config.get("simulation", "output")
         data = [["Stat"] + ["layer-"+str(layer_idx) for layer_idx in range(len(self.total_latency))],
                 ["cycle count"] + self.total_cycle,
                 ["latency"] + self.total_latency,
@@ -251,13 +508,7 @@ class PhotonicAccelerator:
                 ["TOPS"] + total_TOPS,
                 ["TOPS/W"] + total_TOPSW]
 
-        fp = open(output_file, 'w', newline ='')
-        with fp:    
-            write = csv.writer(fp)
-            write.writerows(data)
-        fp.close()
-        
-        return self.total_cycle
+        return data
         
     def update_state(self, start=False):
         """
@@ -291,6 +542,7 @@ class PhotonicAccelerator:
                 self.obj_writes = 0
                 self.cycle = 0
                 self.fft_convs = 0
+                self.obj_fft_convs = 0
                 self.curr_in_channel = 0
                 self.curr_out_channel = 0
             else:
@@ -315,8 +567,8 @@ class PhotonicAccelerator:
                 self.state = 3
         # 4
         elif self.state == 4:
-            if self.curr_out_channel >= self.out_channels:
-                if self.curr_in_channel >= self.in_channels:
+            if self.curr_out_channel >= self.out_limit:
+                if self.curr_in_channel >= self.in_limit:
                     self.state = 5
                 else:
                     if self.read_ready:
@@ -363,31 +615,31 @@ class PhotonicAccelerator:
         # 2
         elif self.state == 2:
             self.fft_convs += 2
+            self.obj_fft_convs += 2
             self.curr_in_channel += self.channels_per_map
             self.curr_out_channel = 0
             if self.read_ready:
-                self.kern_reads += math.ceil(float(self.kernel_size*self.channels_per_map*self.filters_per_map)/self.mem_access_width)
-                self.kern_inef.append(float(math.ceil(float(self.kernel_size*self.channels_per_map*self.filters_per_map)/self.mem_access_width)) / (float(self.kernel_size*self.channels_per_map*self.filters_per_map)/self.mem_access_width))
+                self.kern_reads += math.ceil(float(self.kernel_size*self.channels_per_map*self.filters_per_map*self.kern_density)/self.mem_access_width)
+                self.kern_inef.append(float(math.ceil(float(self.kernel_size*self.channels_per_map*self.filters_per_map*self.kern_density)/self.mem_access_width)) / (float(self.kernel_size*self.channels_per_map*self.filters_per_map*self.kern_density)/self.mem_access_width))
             return
         # 3
         elif self.state == 3:
             if self.read_ready:
-                self.kern_reads += math.ceil(float(self.kernel_size*self.channels_per_map*self.filters_per_map)/self.mem_access_width)
-                self.kern_inef.append(float(math.ceil(float(self.kernel_size*self.channels_per_map*self.filters_per_map)/self.mem_access_width)) / (float(self.kernel_size*self.channels_per_map*self.filters_per_map)/self.mem_access_width))
+                self.kern_reads += math.ceil(float(self.kernel_size*self.channels_per_map*self.filters_per_map*self.kern_density)/self.mem_access_width)
+                self.kern_inef.append(float(math.ceil(float(self.kernel_size*self.channels_per_map*self.filters_per_map*self.kern_density)/self.mem_access_width)) / (float(self.kernel_size*self.channels_per_map*self.filters_per_map*self.kern_density)/self.mem_access_width))
             return
         # 4
         elif self.state == 4:
             # 2 fft_convs to compensate for complex number computation
             self.cycle += 3
             self.fft_convs += 2
-            #self.obj_writes += math.ceil(float(self.out_obj_size*self.filters_per_map) / self.mem_access_width)
-            self.obj_writes += math.ceil(float(self.out_obj_size) / self.mem_access_width)
-            self.obj_write_inef.append(float(math.ceil(float(self.out_obj_size*self.filters_per_map) / self.mem_access_width)) / (float(self.out_obj_size*self.filters_per_map) / self.mem_access_width))
+            self.obj_writes += math.ceil(float(self.out_obj_size*self.maps_per_exposure) / self.mem_access_width)
+            self.obj_write_inef.append(float(math.ceil(float(self.out_obj_size*self.maps_per_exposure) / self.mem_access_width)) / (float(self.out_obj_size*self.maps_per_exposure) / self.mem_access_width))
             self.curr_out_channel += self.filters_per_map
-            if self.read_ready and self.curr_out_channel < self.out_channels:
-                self.kern_reads += math.ceil(float(self.kernel_size*self.channels_per_map*self.filters_per_map)/self.mem_access_width)
-                self.kern_inef.append(float(math.ceil(float(self.kernel_size*self.channels_per_map*self.filters_per_map)/self.mem_access_width)) / (float(self.kernel_size*self.channels_per_map*self.filters_per_map)/self.mem_access_width))
-            if self.read_ready and self.curr_out_channel >= self.out_channels:
+            if self.read_ready and self.curr_out_channel < self.out_limit:
+                self.kern_reads += math.ceil(float(self.kernel_size*self.channels_per_map*self.filters_per_map*self.kern_density)/self.mem_access_width)
+                self.kern_inef.append(float(math.ceil(float(self.kernel_size*self.channels_per_map*self.filters_per_map*self.kern_density)/self.mem_access_width)) / (float(self.kernel_size*self.channels_per_map*self.filters_per_map*self.kern_density)/self.mem_access_width))
+            if self.read_ready and self.curr_out_channel >= self.out_limit:
                 self.obj_reads += math.ceil(float(self.in_obj_size*self.channels_per_map) / self.mem_access_width)
                 self.obj_inef.append(float(math.ceil(float(self.in_obj_size*self.channels_per_map) / self.mem_access_width)) / (float(self.in_obj_size*self.channels_per_map) / self.mem_access_width))
             return
@@ -405,6 +657,109 @@ class PhotonicAccelerator:
             self.compute_stats()
             return
 
+def layer_dims(input_height, input_width, kernel_height, kernel_width, channels, filters, s):
+    """ Convert one model config row into load_layer() arguments """
+    # assuming padded inputs
+    padding_height = (kernel_height // 2) * 2
+    padding_width = (kernel_width // 2) * 2
+    in_obj_size = input_height * input_width
+    out_obj_size = ((input_height - padding_height)/s) * ((input_width - padding_width)/s)
+    return in_obj_size, out_obj_size, channels, filters, kernel_height * kernel_width, s
+
+def supported_layer(name, skip_resid=False):
+    """ We support only CONV-type layers. "WA" is 1x1 pointwise CONV """
+    return "Conv" in name or "WA" in name or ((not skip_resid) and ("Resid" in name))
+
+# Optional model config columns after the 8 required ones: (CSV header, layer table key, type)
+OPTIONAL_COLUMNS = [("Groups", "groups", int), ("Nb", "Nb", float), ("MinNb", "min_Nb", float),
+                    ("Density", "density", float), ("Structure", "structure", str), ("Separable", "separable", int)]
+
+SPARSITY_STRUCTURES = ["unstructured", "block", "filter"]
+
+def layer_table(rows, skip_resid=False, columns=None):
+    """
+    Convert model config rows [name, H, W, KH, KW, C, N, S, <optional columns>] into a layer table:
+    one dict of load_layer() arguments (plus "name") per supported layer
+    columns - position of each optional column (layer table key -> index), see optional_columns().
+              Without it rows only carry the required fields: trailing fields (e.g. the "bases"
+              column of the shipped configs) are ignored. Empty fields use defaults.
+    Layers with a non-zero Separable field (and no explicit group count) are depthwise-separable:
+    they expand into a depthwise convolution ("-dw") followed by a 1x1 pointwise convolution ("-pw")
+    """
+    if columns is None:
+        columns = {}
+    types = {key: typ for header, key, typ in OPTIONAL_COLUMNS}
+    keys = ["name", "in_obj_size", "out_obj_size", "in_channels", "out_channels", "kernel_size", "stride"]
+    layers = []
+    for row in rows:
+        name = str(row[0]).strip()
+        if len(row) < 8 or not supported_layer(name, skip_resid):
+            continue
+        H, W, KH, KW, C, N, S = [int(field) for field in row[1:8]]
+        options = {}
+        for key, idx in columns.items():
+            if idx < len(row) and str(row[idx]).strip() != "":
+                options[key] = types[key](str(row[idx]).strip())
+        separable = options.pop("separable", 0)
+        if separable and "groups" not in options:
+            # output of the depthwise stage feeds the pointwise stage
+            dw_H = int((H - (KH // 2) * 2) / S)
+            dw_W = int((W - (KW // 2) * 2) / S)
+            layers.append(dict(zip(keys, (name + "-dw",) + layer_dims(H, W, KH, KW, C, C, S)), groups=C, **options))
+            layers.append(dict(zip(keys, (name + "-pw",) + layer_dims(dw_H, dw_W, 1, 1, C, N, 1)), **options))
+        else:
+            layers.append(dict(zip(keys, (name,) + layer_dims(H, W, KH, KW, C, N, S)), **options))
+    return layers
+
+def optional_columns(header):
+    """ Position of each optional column named in a model config header (layer table key -> index) """
+    header = [str(name).strip() for name in header]
+    return {key: header.index(name) for name, key, typ in OPTIONAL_COLUMNS if name in header}
+
+def read_layers(path, skip_resid=False):
+    """ Layer table of a model config CSV; optional columns are found by their header """
+    f = open(path, "r")
+    columns = optional_columns(next(f).split(','))
+    rows = [line.strip().split(',') for line in f]
+    f.close()
+    return layer_table(rows, skip_resid, columns)
+
+def read_precisions(path):
+    """ Precision side table CSV with "Layer name" and "Nb" and/or "MinNb" columns: {name: {key: value}} """
+    with open(path, "r", newline='') as fin:
+        rows = [{field.strip(): value.strip() for field, value in row.items() if field is not None} for row in csv.DictReader(fin)]
+    table = {}
+    for row in rows:
+        table[row["Layer name"]] = {key: typ(row[header]) for header, key, typ in OPTIONAL_COLUMNS
+                                    if key in ("Nb", "min_Nb") and row.get(header, "") != ""}
+    return table
+
+def apply_precisions(layers, table):
+    """ Copy of a layer table with precisions from a side table (see read_precisions) """
+    return [dict(layer, **table.get(layer["name"], {})) for layer in layers]
+
+def precision_search(acc, layers, precisions):
+    """
+    Lowest-energy precision assignment
+    Every layer gets the supported precision, no lower than its "min_Nb" (or its "Nb",
+    or [photonic] Nb, when not given), with the lowest simulated energy. A layer's energy
+    does not depend on the other layers' precisions, so choosing per layer is optimal.
+    Returns a copy of the layer table with "Nb" set; clears the accelerator's lifetime stats
+    """
+    assigned = []
+    for layer in layers:
+        lowest = layer.get("min_Nb", layer.get("Nb", acc.Nb))
+        candidates = [Nb for Nb in sorted(precisions) if Nb >= lowest]
+        assert len(candidates) > 0, "No supported precision for layer {}".format(layer["name"])
+        energies = []
+        for Nb in candidates:
+            acc.reset()
+            acc.run_layers([dict(layer, Nb=Nb)])
+            energies.append(acc.photonic_energy[0] + acc.digital_energy[0] + acc.obj_energy[0] + acc.kern_energy[0])
+        assigned.append(dict(layer, Nb=candidates[energies.index(min(energies))]))
+    acc.reset()
+    return assigned
+
 def read_config(path, skip_resid=False):
     """ input filter/IFM/OFM dimensions """
     
@@ -422,23 +777,16 @@ def read_config(path, skip_resid=False):
         line = line.strip()
         line = line.split(',')
         # We support only CONV-type laters. "WA" is 1x1 pointwise CONV
-        if len(line) >= 7 and ("Conv" in line[0] or "WA" in line[0] or ((not skip_resid) and ("Resid" in line[0]))):
+        if len(line) >= 7 and supported_layer(line[0], skip_resid):
             print(line)
             layer_name.append(line[0])
-            kernel_height = int(line[3])
-            kernel_width = int(line[4])
-            kernel_size.append(kernel_height * kernel_width)
-            # assuming padded inputs
-            padding_height = (kernel_height // 2) * 2
-            padding_width = (kernel_width // 2) * 2
-            input_height = int(line[1])
-            input_width = int(line[2])
-            in_obj_size.append(input_height * input_width)
-            s = int(line[7])
-            out_obj_size.append(((input_height - padding_height)/s) * ((input_width - padding_width)/s))
-            in_channels.append(int(line[5]))
-            out_channels.append(int(line[6]))
-            stride.append(int(line[7]))
+            dims = layer_dims(int(line[1]), int(line[2]), int(line[3]), int(line[4]), int(line[5]), int(line[6]), int(line[7]))
+            in_obj_size.append(dims[0])
+            out_obj_size.append(dims[1])
+            in_channels.append(dims[2])
+            out_channels.append(dims[3])
+            kernel_size.append(dims[4])
+            stride.append(dims[5])
         else:
             print("Skipping: {}".format(line[0]))
     f.close()
@@ -459,13 +807,8 @@ def main():
         # configure accelerator with current layer dimensions
         acc.load_layer(in_obj_size[layer_idx], out_obj_size[layer_idx], in_channels[layer_idx], out_channels[layer_idx], kernel_size[layer_idx], stride[layer_idx])
 
-        # update and apply FSM state until 'done' signal is reached
-        acc.update_state(True)
-        cycle = 0
-        while not acc.done:
-            acc.apply_latch()
-            acc.update_state()
-            cycle += 1
+        # run the layer until 'done' signal is reached
+        cycle = acc.simulate_layer()
         print("Cycle count = {}".format(cycle))
 
     print()
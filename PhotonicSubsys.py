@@ -5,7 +5,7 @@ Author:   Edward Hanson (edward.t.hanson@duke.edu)
 """
 
 import numpy as np
-import configparser as cp
+from SimConfig import load_config
 
 class PhotonicSubsys:
 
@@ -15,29 +15,43 @@ class PhotonicSubsys:
         Nb          - precision of each pixel
         """
 
-        self.config = cp.ConfigParser()
-        self.config.read(config_path)
+        self.config = load_config(config_path)
         
         self.MS_pix = MS_pix
         self.Nb = Nb
         # wavelength of light
         self.lmbda = 905e-9
+        # Wavelength-division multiplexing: number of wavelengths sharing the MS concurrently,
+        # each carrying an independent convolution, on a grid of wdm_spacing (m)
+        self.wdm = int(self.config.get("photonic", "wdm", fallback="1"))
+        self.wdm_spacing = float(self.config.get("photonic", "wdm_spacing", fallback="0.8e-9"))
+        self.lmbdas = [self.lmbda + i*self.wdm_spacing for i in range(self.wdm)]
         # Plank's constant
         self.hbar = 1.05e-34
         # speed of light
         self.c = 2.998e8
         # angular frequency
         self.omega = 2*np.pi*self.c/self.lmbda
+        # Time to take measurement (determined by LC switching speed)
+        self.t = float(self.config.get("photonic", "t"))
+        self.set_precision(Nb)
+
+    def set_precision(self, Nb):
+        """
+        Change the pixel precision (e.g. per layer) and recompute the optical energy
+        """
+        self.Nb = Nb
         # number of photons (per pixel) required to achieve N_b precision given SNR from shot noise is sqrt(np)
         self.np = (2/3)*2**(2*self.Nb)
 
-        # Total optical energy required to make the measurement
+        # Total optical energy required to make the measurement (every wavelength needs its own photons),
+        # and of a measurement on the base wavelength alone
         if int(self.config.get("general", "en_optical")):
-            self.E = self.hbar*self.omega*self.np*self.MS_pix
+            self.E = sum(self.hbar*(2*np.pi*self.c/lmbda) for lmbda in self.lmbdas)*self.np*self.MS_pix
+            self.E_single = self.hbar*(2*np.pi*self.c/self.lmbda)*self.np*self.MS_pix
         else:
             self.E = 0
-        # Time to take measurement (determined by LC switching speed)
-        self.t = float(self.config.get("photonic", "t"))
+            self.E_single = 0
         # Optical power
         self.P = self.E / self.t
 
@@ -0,0 +1,97 @@
+"""
+File:     Roofline.py
+Desc:     Roofline-style bottleneck report of a simulated model. For every layer
+          (and the whole model) computes the operational intensity and the
+          attainable throughput under each hardware ceiling, classifies the
+          binding ceiling, and estimates the speedup of upgrading each one.
+          photonic - optical exposures (FFT convs) at the LC switching time
+          adda     - values converted by the DAC and ADC rows, one MS frame per row latency
+          buffer   - object/kernel buffer accesses at their CACTI cycle time
+          Ceilings come from the hardware stats, so they ignore [general] cp_override.
+"""
+
+import csv
+
+CEILINGS = ["photonic", "adda", "buffer"]
+
+class Roofline:
+
+    def __init__(self, acc, upgrade=2.0):
+        """
+        acc     - PhotonicAccelerator after simulating a model
+        upgrade - factor by which an upgraded ceiling is made faster
+        """
+        self.acc = acc
+        self.upgrade = upgrade
+
+    def ceiling_times(self, i):
+        """ Time (s) layer i would take if only each ceiling limited it """
+        acc = self.acc
+        # buffers are banked, and a second port serves reads and writes concurrently
+        obj_accesses = (acc.total_obj_reads[i] + acc.total_obj_writes[i]) / acc.object_buffer.num_ports
+        # converted values, counted as in layer_energies(): complex kernels and outputs take two conversions,
+        # kernels and outputs are spread over the wdm rows, objects use a single wavelength
+        dac_values = (acc.total_obj_reads[i] + acc.total_kern_reads[i]*2 / acc.wdm) * acc.mem_access_width
+        adc_values = acc.total_obj_writes[i]*2 / acc.wdm * acc.mem_access_width
+        frame = acc.MS_dim**2
+        return {"photonic": acc.total_fft_convs[i] * acc.photonic.t,
+                "adda": (dac_values * acc.digital.DACrow_latency + adc_values * acc.digital.ADCrow_latency) / frame,
+                "buffer": max(obj_accesses * acc.object_buffer.latency,
+                              acc.total_kern_reads[i] * acc.kernel_buffer.latency) / acc.banks}
+
+    def buffer_bytes(self, i):
+        """ Bytes moved through the buffers by layer i, in the simulator's fixed-width accesses """
+        acc = self.acc
+        accesses = acc.total_obj_reads[i] + acc.total_obj_writes[i] + acc.total_kern_reads[i]
+        return accesses * acc.mem_access_width
+
+    def analyze(self, ops, nbytes, latency, times):
+        """ One report entry from OPs, buffer bytes, simulated latency and ceiling times """
+        bound = max(CEILINGS, key=lambda ceiling: times[ceiling])
+        entry = {"ops": ops,
+                 "buffer_bytes": nbytes,
+                 "intensity": ops / nbytes if nbytes > 0 else float("inf"),
+                 "achieved": ops / latency,
+                 "bound": bound}
+        for ceiling in CEILINGS:
+            entry[ceiling + "_attainable"] = ops / times[ceiling] if times[ceiling] > 0 else float("inf")
+            # speedup of the ceiling-limited time if only this ceiling were upgraded
+            upgraded = max(times[other] / self.upgrade if other == ceiling else times[other] for other in CEILINGS)
+            entry[ceiling + "_speedup"] = max(times.values()) / upgraded if upgraded > 0 else float("inf")
+        return entry
+
+    def layers(self):
+        """ One report entry per simulated layer """
+        acc = self.acc
+        return [self.analyze(acc.total_ops[i], self.buffer_bytes(i), acc.total_latency[i], self.ceiling_times(i))
+                for i in range(len(acc.total_latency))]
+
+    def model(self):
+        """ Report entry of the whole model (layers run back to back) """
+        acc = self.acc
+        n = len(acc.total_latency)
+        times = {ceiling: sum(self.ceiling_times(i)[ceiling] for i in range(n)) for ceiling in CEILINGS}
+        return self.analyze(sum(acc.total_ops), sum(self.buffer_bytes(i) for i in range(n)), sum(acc.total_latency), times)
+
+    def rows(self):
+        """ Report in the traces layout: one row per stat, one column per layer, then the model """
+        entries = self.layers() + [self.model()]
+        stats = [("OP", "ops"),
+                 ("Buffer bytes", "buffer_bytes"),
+                 ("Operational intensity (OP/B)", "intensity"),
+                 ("Achieved OP/s", "achieved"),
+                 ("Photonic attainable OP/s", "photonic_attainable"),
+                 ("DAC/ADC attainable OP/s", "adda_attainable"),
+                 ("Buffer attainable OP/s", "buffer_attainable"),
+                 ("Bound", "bound"),
+                 ("{}x photonic speedup".format(self.upgrade), "photonic_speedup"),
+                 ("{}x DAC/ADC speedup".format(self.upgrade), "adda_speedup"),
+                 ("{}x buffer speedup".format(self.upgrade), "buffer_speedup")]
+        data = [["Stat"] + ["layer-"+str(layer_idx) for layer_idx in range(len(entries) - 1)] + ["model"]]
+        for name, key in stats:
+            data.append([name] + [entry[key] for entry in entries])
+        return data
+
+    def write(self, path):
+        with open(path, 'w', newline='') as fp:
+            csv.writer(fp).writerows(self.rows())
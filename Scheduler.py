@@ -0,0 +1,170 @@
+"""
+File:     Scheduler.py
+Desc:     Multi-tenant request scheduling on one photonic accelerator.
+          Replays a request-arrival trace over several models using the per-layer
+          latencies computed by PhotonicAccelerator, and reports throughput,
+          queueing delay and tail latency.
+Usage:    python Scheduler.py --models YOLOv3.csv ResNet50.csv --rate 20 --requests 1000 --policy preempt
+"""
+
+from PhotonicAccelerator import PhotonicAccelerator, read_layers
+import os
+import csv
+import heapq
+import argparse
+import numpy as np
+
+# fifo    - run whole requests in arrival order
+# sjf     - run whole requests, shortest job first
+# preempt - shortest remaining time first, re-decided at every layer boundary
+POLICIES = ["fifo", "sjf", "preempt"]
+
+class Scheduler:
+
+    def __init__(self, layer_latencies, policy="fifo", switch_latency=0):
+        """
+        layer_latencies - {model: [latency of each layer (s)]}
+        policy          - one of POLICIES
+        switch_latency  - extra latency (s) whenever the accelerator switches to a different request
+        """
+        assert policy in POLICIES, "Unsupported policy!"
+        self.layer_latencies = layer_latencies
+        self.job_latency = {model: sum(latencies) for model, latencies in layer_latencies.items()}
+        self.policy = policy
+        self.switch_latency = switch_latency
+
+    def priority(self, job):
+        """ Smaller runs first; ties broken by arrival order """
+        if self.policy == "fifo":
+            return (job["arrival"], job["id"])
+        if self.policy == "sjf":
+            return (self.job_latency[job["model"]], job["arrival"], job["id"])
+        return (job["remaining"], job["arrival"], job["id"])
+
+    def run(self, arrivals):
+        """
+        arrivals - [(arrival time (s), model)]
+        Returns one dict per request with arrival, start, finish, latency and queueing delay
+        """
+        jobs = [{"id": i, "arrival": t, "model": model, "next_layer": 0, "remaining": self.job_latency[model], "start": None}
+                for i, (t, model) in enumerate(sorted(arrivals, key=lambda arrival: arrival[0]))]
+        ready = []
+        now = 0.0
+        idx = 0
+        current = None
+        while idx < len(jobs) or ready:
+            # admit everything that has arrived by now
+            if not ready and idx < len(jobs) and jobs[idx]["arrival"] > now:
+                now = jobs[idx]["arrival"]
+            while idx < len(jobs) and jobs[idx]["arrival"] <= now:
+                heapq.heappush(ready, (self.priority(jobs[idx]), jobs[idx]["id"]))
+                idx += 1
+
+            job = jobs[heapq.heappop(ready)[1]]
+            if current is not None and current != job["id"]:
+                now += self.switch_latency
+            current = job["id"]
+            if job["start"] is None:
+                job["start"] = now
+
+            latencies = self.layer_latencies[job["model"]]
+            if self.policy == "preempt":
+                # one layer, then reconsider
+                now += latencies[job["next_layer"]]
+                job["remaining"] -= latencies[job["next_layer"]]
+                job["next_layer"] += 1
+            else:
+                now += sum(latencies[job["next_layer"]:])
+                job["next_layer"] = len(latencies)
+
+            if job["next_layer"] < len(latencies):
+                while idx < len(jobs) and jobs[idx]["arrival"] <= now:
+                    heapq.heappush(ready, (self.priority(jobs[idx]), jobs[idx]["id"]))
+                    idx += 1
+                heapq.heappush(ready, (self.priority(job), job["id"]))
+            else:
+                job["finish"] = now
+
+        for job in jobs:
+            job["latency"] = job["finish"] - job["arrival"]
+            job["queueing"] = job["latency"] - self.job_latency[job["model"]]
+        return jobs
+
+    def report(self, jobs):
+        """ Throughput, queueing delay and latency percentiles, overall and per model """
+        def stats(subset):
+            latency = np.array([job["latency"] for job in subset])
+            queueing = np.array([job["queueing"] for job in subset])
+            return {"requests": len(subset),
+                    "mean_queueing": float(np.mean(queueing)),
+                    "p50_latency": float(np.percentile(latency, 50)),
+                    "p99_latency": float(np.percentile(latency, 99)),
+                    "max_latency": float(np.max(latency))}
+
+        span = max(job["finish"] for job in jobs) - min(job["arrival"] for job in jobs)
+        busy = sum(self.job_latency[job["model"]] for job in jobs)
+        result = stats(jobs)
+        result["throughput"] = len(jobs) / span
+        result["utilization"] = busy / span
+        result["models"] = {model: stats([job for job in jobs if job["model"] == model])
+                            for model in sorted(set(job["model"] for job in jobs))}
+        return result
+
+def poisson_arrivals(models, rate, requests, weights=None, seed=0):
+    """ Poisson arrival process at rate (requests/s), each request picking a model by weight """
+    rng = np.random.default_rng(seed)
+    times = np.cumsum(rng.exponential(1 / rate, requests))
+    picks = rng.choice(len(models), size=requests, p=weights)
+    return [(float(t), models[i]) for t, i in zip(times, picks)]
+
+def read_arrivals(path):
+    """ Arrival trace CSV with "time" (s) and "model" columns """
+    with open(path, "r", newline='') as fin:
+        return [(float(row["time"]), row["model"].strip()) for row in csv.DictReader(fin)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-tenant scheduling on one photonic accelerator")
+    parser.add_argument("--config", type=str, default="default.cfg", help="Simulation configuration file, loaded from acc_cfgs/")
+    parser.add_argument("--models", type=str, nargs='+', required=True, help="Model configs, loaded from model_cfgs/")
+    parser.add_argument("--policy", type=str, default="fifo", choices=POLICIES, help="Scheduling policy")
+    parser.add_argument("--trace", type=str, default=None, help="Arrival trace CSV (time,model); Poisson arrivals otherwise")
+    parser.add_argument("--rate", type=float, default=10, help="Poisson arrival rate (requests/s)")
+    parser.add_argument("--requests", type=int, default=1000, help="Number of Poisson arrivals")
+    parser.add_argument("--weights", type=float, nargs='+', default=None, help="Relative request mix per model")
+    parser.add_argument("--switch-latency", type=float, default=0, help="Latency (s) to switch between requests")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    acc = PhotonicAccelerator(os.path.join(cwd, "acc_cfgs", args.config))
+    skip_resid = int(acc.config.get("simulation", "skip_resid"))
+
+    # per-layer latencies of each model, simulated once
+    layer_latencies = {}
+    for model in args.models:
+        acc.reset()
+        acc.run_layers(read_layers(os.path.join(cwd, "model_cfgs", model), skip_resid))
+        layer_latencies[model] = list(acc.total_latency)
+        print("{}: {} layers, {} s".format(model, len(acc.total_latency), sum(acc.total_latency)))
+
+    if args.trace is not None:
+        arrivals = read_arrivals(args.trace)
+    else:
+        weights = None if args.weights is None else list(np.array(args.weights) / sum(args.weights))
+        arrivals = poisson_arrivals(args.models, args.rate, args.requests, weights, args.seed)
+
+    scheduler = Scheduler(layer_latencies, args.policy, args.switch_latency)
+    result = scheduler.report(scheduler.run(arrivals))
+
+    print(" --- {} schedule --- ".format(args.policy))
+    print("Requests: \t\t{}".format(result["requests"]))
+    print("Throughput: \t\t{} req/s".format(result["throughput"]))
+    print("Utilization: \t\t{:%}".format(result["utilization"]))
+    print("Mean queueing delay: \t{} s".format(result["mean_queueing"]))
+    print("p50 latency: \t\t{} s".format(result["p50_latency"]))
+    print("p99 latency: \t\t{} s".format(result["p99_latency"]))
+    for model, stats in result["models"].items():
+        print("\t{}: \t{} req, p50 {} s, p99 {} s, queueing {} s".format(model, stats["requests"], stats["p50_latency"], stats["p99_latency"], stats["mean_queueing"]))
+
+if __name__ == "__main__":
+    main()
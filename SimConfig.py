@@ -0,0 +1,38 @@
+"""
+File:     SimConfig.py
+Desc:     Helpers for simulation configs given either as a file path or as an
+          in-memory ConfigParser (e.g. a base config plus overrides)
+"""
+
+import hashlib
+import configparser as cp
+
+def load_config(config_path):
+    """ ConfigParser for a config file path, or the given ConfigParser itself """
+    if isinstance(config_path, cp.ConfigParser):
+        return config_path
+    config = cp.ConfigParser()
+    config.read(config_path)
+    return config
+
+def apply_overrides(config_path, overrides):
+    """
+    Copy of a config with overrides applied
+    overrides - {section: {option: value}}
+    """
+    base = load_config(config_path)
+    config = cp.ConfigParser()
+    config.read_dict(base)
+    for section, options in overrides.items():
+        if not config.has_section(section):
+            config.add_section(section)
+        for option, value in options.items():
+            config.set(section, option, str(value))
+    return config
+
+def config_hash(config_path):
+    """ Stable hash of the effective config contents """
+    config = load_config(config_path)
+    text = "\n".join("[{}] {}={}".format(section, option, config.get(section, option))
+                     for section in sorted(config.sections()) for option in sorted(config.options(section)))
+    return hashlib.sha1(text.encode()).hexdigest()
@@ -0,0 +1,127 @@
+"""
+File:     SweepStore.py
+Desc:     Columnar, indexed store for CACTI sweep results.
+          One memory-mapped .npy file per column plus a small JSON schema header.
+          Rows are kept sorted by the sweep parameters, so exact lookups are
+          binary searches and filters are vectorized masks.
+"""
+
+import os
+import json
+import numpy as np
+
+SCHEMA_FNAME = "schema.json"
+SCHEMA_VERSION = 1
+
+# Sweep parameters (index columns), in sort order
+PARAMS = ["size", "line_size", "associativity", "banks", "technode", "temp"]
+# Stats extracted per sweep point
+STATS = ["cycle_time", "read_energy", "write_energy", "static_power", "area"]
+UNITS = {"size": "bytes", "line_size": "bytes", "associativity": "", "banks": "", "technode": "um", "temp": "K",
+         "cycle_time": "s", "read_energy": "J/byte", "write_energy": "J/byte", "static_power": "W", "area": "mm2"}
+
+class SweepStore:
+
+    def __init__(self, path):
+        """
+        path - store directory, as written by SweepStore.write()
+        """
+        self.path = path
+        with open(os.path.join(path, SCHEMA_FNAME), 'r') as fin:
+            self.schema = json.load(fin)
+        assert self.schema["version"] == SCHEMA_VERSION, "Unsupported sweep store version!"
+
+        self.params = self.schema["params"]
+        self.stats = self.schema["stats"]
+        self.rows = self.schema["rows"]
+        # Fingerprint of the CACTI template the sweep varied (see CactiConfig.fingerprint()), None if unknown
+        self.template = self.schema.get("template")
+        self.columns = {}
+        for name in self.params + self.stats:
+            self.columns[name] = np.load(os.path.join(path, name + ".npy"), mmap_mode='r')
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def lookup(self, **params):
+        """
+        Exact match on a prefix of the sweep parameters (in PARAMS order)
+        Returns the matching row indices as a range, narrowed by binary search
+        """
+        prefix = self.params[:len(params)]
+        assert set(params) == set(prefix), "lookup() needs a prefix of {}, use select() otherwise".format(self.params)
+        lo, hi = 0, self.rows
+        for name in prefix:
+            # rows in [lo, hi) share the previous parameters, so this column is sorted there
+            col = self.columns[name][lo:hi]
+            lo, hi = lo + int(np.searchsorted(col, params[name], 'left')), lo + int(np.searchsorted(col, params[name], 'right'))
+        return range(lo, hi)
+
+    def get(self, **params):
+        """ Stats of the single sweep point matching all parameters, or None """
+        rows = self.lookup(**params)
+        if len(rows) != 1:
+            return None
+        return {name: float(self.columns[name][rows[0]]) for name in self.params + self.stats}
+
+    def select(self, **conditions):
+        """
+        Vectorized filter over any columns
+        Each condition is a value (equality), a (lo, hi) tuple (inclusive range) or a list (membership)
+        Returns a dict of column arrays for the matching rows
+        """
+        mask = np.ones(self.rows, dtype=bool)
+        for name, cond in conditions.items():
+            col = self.columns[name]
+            if isinstance(cond, tuple):
+                mask &= (col >= cond[0]) & (col <= cond[1])
+            elif isinstance(cond, list):
+                mask &= np.isin(col, cond)
+            else:
+                mask &= (col == cond)
+        return {name: np.asarray(col[mask]) for name, col in self.columns.items()}
+
+    @staticmethod
+    def write(path, columns, template=None):
+        """
+        Write a new store from a dict of equal-length columns (PARAMS + STATS)
+        Rows are sorted by the sweep parameters before writing
+        template - fingerprint of the CACTI template every sweep point was rendered from
+        """
+        os.makedirs(path, exist_ok=True)
+        data = {name: np.asarray(columns[name], dtype=np.float64) for name in PARAMS + STATS}
+        # np.lexsort sorts by the last key first
+        order = np.lexsort([data[name] for name in reversed(PARAMS)])
+        for name, col in data.items():
+            np.save(os.path.join(path, name + ".npy"), col[order])
+        schema = {"version": SCHEMA_VERSION, "params": PARAMS, "stats": STATS, "units": UNITS, "rows": int(len(order)),
+                  "template": template}
+        with open(os.path.join(path, SCHEMA_FNAME), 'w') as fout:
+            json.dump(schema, fout, indent=1)
+        return SweepStore(path)
+
+def read_summary(path):
+    """ Parse a legacy tab-and-comma summary.csv written by utils/cacti_sweep.py """
+    columns = {name: [] for name in PARAMS + STATS}
+    fin = open(path, "r")
+    next(fin) # skip header line
+    for line in fin:
+        fields = [field.strip() for field in line.split(',')]
+        if len(fields) < len(PARAMS) + len(STATS):
+            continue
+        for name, field in zip(PARAMS + STATS, fields):
+            columns[name].append(float(field))
+    fin.close()
+    return columns
+
+def main():
+    # Convert a legacy summary.csv: python SweepStore.py utils/sweep_data/summary.csv utils/sweep_data/store
+    import sys
+    store = SweepStore.write(sys.argv[2], read_summary(sys.argv[1]))
+    print("Wrote {} sweep points to {}".format(len(store), store.path))
+
+if __name__ == "__main__":
+    main()
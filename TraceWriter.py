@@ -0,0 +1,80 @@
+"""
+File:     TraceWriter.py
+Desc:     Streams per-layer traces to disk as each layer finishes, one layer per row
+          (the transpose of the summary() traces CSV), with running cumulative sums.
+          Optionally also appends every row as float64 records to a binary file with a
+          small JSON schema header, loadable column-wise with read_trace().
+          Rows are flushed per layer, so a crashed run keeps every finished layer.
+"""
+
+import os
+import csv
+import json
+import numpy as np
+
+SCHEMA_VERSION = 1
+
+# Streamed stats, in column order. "Scaled MS utilization" needs the whole model and
+# is only in the summary() traces.
+COLUMNS = ["cycle count", "latency", "Accumulated latency", "FFT convs", "Obj buffer reads", "Obj buffer writes",
+           "Kern buffer reads", "MS utilization", "OP", "Photonic energy", "Digital energy", "DAC energy", "ADC energy",
+           "Object buffer energy", "Kernel buffer energy", "Total energy", "Accumulated energy", "TOPS", "TOPS/W"]
+
+class TraceWriter:
+
+    def __init__(self, path, binary=False):
+        """
+        path   - layer-per-row CSV file
+        binary - also write <path without extension>.bin and .json
+        """
+        self.path = path
+        self.binary = binary
+        self.fp = open(path, 'w', newline='')
+        self.csv = csv.writer(self.fp)
+        self.csv.writerow(["Layer"] + COLUMNS)
+        self.fp.flush()
+        self.bin = None
+        if binary:
+            base = os.path.splitext(path)[0]
+            with open(base + ".json", 'w') as fout:
+                json.dump({"version": SCHEMA_VERSION, "dtype": "float64", "columns": COLUMNS}, fout, indent=1)
+            self.bin = open(base + ".bin", 'wb')
+        self.layers = 0
+        self.accumulated_latency = 0
+        self.accumulated_energy = 0
+
+    def write_layer(self, acc):
+        """ Stream the last layer of the accelerator's lifetime lists """
+        total_energy = acc.photonic_energy[-1] + acc.digital_energy[-1] + acc.obj_energy[-1] + acc.kern_energy[-1]
+        self.accumulated_latency += acc.total_latency[-1]
+        self.accumulated_energy += total_energy
+        row = [acc.total_cycle[-1], acc.total_latency[-1], self.accumulated_latency, acc.total_fft_convs[-1],
+               acc.total_obj_reads[-1], acc.total_obj_writes[-1], acc.total_kern_reads[-1], acc.layerwise_MS_util[-1],
+               acc.total_ops[-1], acc.photonic_energy[-1], acc.digital_energy[-1], acc.DAC_energy[-1], acc.ADC_energy[-1],
+               acc.obj_energy[-1], acc.kern_energy[-1], total_energy, self.accumulated_energy,
+               acc.total_ops[-1] * 1e-12 / acc.total_latency[-1], acc.total_ops[-1] * 1e-12 / total_energy]
+        self.csv.writerow(["layer-"+str(self.layers)] + row)
+        self.fp.flush()
+        if self.bin is not None:
+            self.bin.write(np.array(row, dtype=np.float64).tobytes())
+            self.bin.flush()
+        self.layers += 1
+
+    def close(self):
+        self.fp.close()
+        if self.bin is not None:
+            self.bin.close()
+
+def read_trace(path):
+    """
+    Columns of a binary trace: {stat: array}
+    path - the streamed CSV path (or its .bin); a trailing partial row is dropped
+    """
+    base = os.path.splitext(path)[0]
+    with open(base + ".json", 'r') as fin:
+        schema = json.load(fin)
+    assert schema["version"] == SCHEMA_VERSION, "Unsupported trace version!"
+    data = np.fromfile(base + ".bin", dtype=schema["dtype"])
+    rows = len(data) // len(schema["columns"])
+    data = data[:rows * len(schema["columns"])].reshape(rows, len(schema["columns"]))
+    return {name: data[:, i] for i, name in enumerate(schema["columns"])}
@@ -0,0 +1,174 @@
+"""
+File:     WhatIf.py
+Desc:     Incremental what-if evaluation. The accelerator's derived quantities form a
+          dependency graph (config -> subsystem stats -> per-layer counters ->
+          energies -> summary); changing a config parameter recomputes only the
+          nodes it invalidates, e.g. E_adc only re-derives energies while
+          mem_access_width re-simulates the layers but never reruns CACTI. Buffers are
+          kept per distinct buffer config, so CACTI runs once for each.
+Usage:    python WhatIf.py --set digital.E_adc=2e-12 --set memory.leakage_scale=2
+          python WhatIf.py --sweep digital.E_adc 1e-13 1e-12 1e-11
+"""
+
+from PhotonicAccelerator import PhotonicAccelerator, read_layers
+from SimConfig import apply_overrides
+import os
+import time
+import argparse
+
+# (node, config parameters it reads, upstream nodes), in evaluation order
+# ("section", "*") stands for every option of a section
+GRAPH = [("geometry",       [("photonic", "MS_pix"), ("photonic", "wdm"), ("photonic", "Nb")], []),
+         ("buffers",        [("simulation", "cacti"), ("memory", "kernel_buffer"), ("memory", "object_buffer"), ("memory", "kernel_ports"),
+                             ("memory", "object_ports"), ("memory", "backend"), ("memory", "surrogate")], []),
+         ("buffer_scaling", [("memory", "leakage_scale"), ("general", "en_buffs")], ["buffers"]),
+         ("memory",         [("memory", "mem_access_width"), ("memory", "banks"), ("memory", "mem_override"), ("memory", "E_read"), ("memory", "E_write")], []),
+         ("digital",        [("digital", "*"), ("general", "en_DAC"), ("general", "en_ADC"), ("general", "en_bls"), ("general", "en_nonlinear"),
+                             ("general", "en_control")], ["geometry"]),
+         ("photonic",       [("photonic", "*"), ("general", "en_optical")], ["geometry"]),
+         ("critical_path",  [("general", "cp_override"), ("general", "critical_path"), ("general", "FIFO")], ["buffers", "memory", "digital", "photonic"]),
+         # FSM counters depend on the geometry and access width, and on precision only through the
+         # index overhead of unstructured-sparse kernels (see load_layer()); never on any energy
+         ("counters",       [("photonic", "MS_pix"), ("photonic", "wdm"), ("photonic", "Nb"), ("memory", "mem_access_width")], []),
+         ("energies",       [], ["buffer_scaling", "memory", "digital", "photonic", "critical_path", "counters"]),
+         ("results",        [], ["energies"])]
+
+# Parameters of the buffers node: buffers built from the same values are reused
+BUFFER_PARAMS = dict((node, params) for node, params, upstream in GRAPH)["buffers"]
+
+# Lifetime lists filled by layer_energies(), in its return order
+ENERGY_LISTS = ["total_latency", "photonic_energy", "digital_energy", "DAC_energy", "ADC_energy", "obj_energy", "kern_energy"]
+
+class WhatIf:
+
+    def __init__(self, config_path, layers):
+        """
+        config_path - simulation config file or ConfigParser (copied, never modified)
+        layers      - layer table (see layer_table())
+        """
+        self.config = apply_overrides(config_path, {})
+        self.acc = PhotonicAccelerator(self.config)
+        self.layers = layers
+        self.stale = {"counters", "energies", "results"}
+        # (kernel_buffer, object_buffer) per distinct BUFFER_PARAMS values, so CACTI runs once per buffer config
+        self.buffers = {self.buffer_key(): (self.acc.kernel_buffer, self.acc.object_buffer)}
+        # nodes recomputed by the last evaluate()
+        self.recomputed = []
+        self.result = None
+
+    def invalidate(self, nodes):
+        """ Mark nodes and everything downstream of them stale """
+        stale = set(nodes)
+        for node, params, upstream in GRAPH:
+            if any(dep in stale for dep in upstream):
+                stale.add(node)
+        self.stale |= stale
+
+    def set(self, section, option, value):
+        """ Change one config parameter """
+        self.config.set(section, option, str(value))
+        nodes = [node for node, params, upstream in GRAPH if (section, option) in params or (section, "*") in params]
+        if (section, option) == ("photonic", "Nb") and not self.index_overhead():
+            # dense kernels: counters do not depend on precision
+            nodes.remove("counters")
+        self.invalidate(nodes)
+
+    def index_overhead(self):
+        """ Whether a layer's kernel reads depend on the default precision (unstructured sparsity without its own Nb) """
+        return any(layer.get("density", 1.0) < 1 and layer.get("structure", "unstructured") == "unstructured" and "Nb" not in layer
+                   for layer in self.layers)
+
+    def set_layers(self, layers):
+        """ Change the layer table """
+        self.layers = layers
+        self.invalidate(["counters"])
+
+    def evaluate(self):
+        """ Recompute stale nodes, returns the accelerator's results() """
+        acc = self.acc
+        steps = {"geometry": acc.init_geometry,
+                 "buffers": self.update_buffers,
+                 "buffer_scaling": self.update_buffer_scaling,
+                 "memory": acc.init_memory,
+                 "digital": acc.init_digital,
+                 "photonic": acc.init_photonic,
+                 "critical_path": acc.init_critical_path,
+                 "counters": self.update_counters,
+                 "energies": self.update_energies,
+                 "results": self.update_results}
+        self.recomputed = [node for node, params, upstream in GRAPH if node in self.stale]
+        for node in self.recomputed:
+            steps[node]()
+        self.stale = set()
+        return self.result
+
+    def buffer_key(self):
+        return tuple(self.config.get(section, option, fallback="") for section, option in BUFFER_PARAMS)
+
+    def update_buffers(self):
+        key = self.buffer_key()
+        if key not in self.buffers:
+            self.acc.init_buffers()
+            self.buffers[key] = (self.acc.kernel_buffer, self.acc.object_buffer)
+        self.acc.kernel_buffer, self.acc.object_buffer = self.buffers[key]
+
+    def update_buffer_scaling(self):
+        self.acc.kernel_buffer.apply_scaling()
+        self.acc.object_buffer.apply_scaling()
+
+    def update_counters(self):
+        self.acc.reset()
+        self.acc.run_layers(self.layers)
+
+    def update_energies(self):
+        """ Re-derive every layer's latency and energies from its stored counters """
+        acc = self.acc
+        for i, layer in enumerate(self.layers):
+            # layers without their own precision follow the (possibly changed) default
+            acc.layer_Nb[i] = layer.get("Nb", acc.Nb)
+            acc.photonic.set_precision(acc.layer_Nb[i])
+            acc.digital.set_precision(acc.layer_Nb[i])
+            stats = acc.layer_energies(acc.total_cycle[i], acc.total_fft_convs[i], acc.total_obj_fft_convs[i], acc.total_obj_reads[i],
+                                       acc.total_kern_reads[i], acc.total_obj_writes[i])
+            for name, value in zip(ENERGY_LISTS, stats):
+                getattr(acc, name)[i] = value
+
+    def update_results(self):
+        self.result = self.acc.results()
+
+def parse_param(text):
+    """ "section.option" -> (section, option) """
+    section, option = text.split('.', 1)
+    return section, option
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental what-if evaluation of config changes")
+    parser.add_argument("--config", type=str, default="default.cfg", help="Simulation configuration file, loaded from acc_cfgs/")
+    parser.add_argument("--set", type=str, action="append", default=[], help="section.option=value, applied one after another")
+    parser.add_argument("--sweep", type=str, nargs='+', default=None, help="section.option followed by the values to evaluate")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    whatif = WhatIf(os.path.join(cwd, "acc_cfgs", args.config), [])
+    model_cfg = os.path.join(cwd, "model_cfgs", whatif.config.get("simulation", "model_cfg"))
+    whatif.set_layers(read_layers(model_cfg, int(whatif.config.get("simulation", "skip_resid"))))
+
+    def report(label):
+        start = time.time()
+        result = whatif.evaluate()
+        print("{}: \tlatency {} s, energy {} J, TOPS/W {} \t({:.3f} s, recomputed {})".format(
+            label, result["latency"], result["energy"], result["TOPS/W"], time.time() - start, ", ".join(whatif.recomputed)))
+
+    report("baseline")
+    for change in args.set:
+        param, value = change.split('=', 1)
+        whatif.set(*parse_param(param), value)
+        report(change)
+    if args.sweep is not None:
+        section, option = parse_param(args.sweep[0])
+        for value in args.sweep[1:]:
+            whatif.set(section, option, value)
+            report("{}.{}={}".format(section, option, value))
+
+if __name__ == "__main__":
+    main()
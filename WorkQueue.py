@@ -0,0 +1,162 @@
+"""
+File:     WorkQueue.py
+Desc:     Sweep work queue living in a shared directory, so workers on many nodes
+          (or several local processes) can split one sweep.
+          pending/  - tasks waiting for a worker, one JSON file each
+          claimed/  - tasks being run; claiming is an atomic rename out of pending/,
+                      and the worker keeps the file's mtime fresh as a heartbeat
+          done/     - finished tasks
+          results/  - one JSON result per task, written atomically
+          Claims whose heartbeat is older than the timeout are moved back to pending/.
+          Heartbeat age is measured against the mtime of a probe file, so both
+          timestamps come from the filesystem's clock, not from skewed node clocks.
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+
+DIRS = ["pending", "claimed", "done", "results"]
+
+def write_atomic(path, data):
+    """ Write JSON so readers never see a partial file """
+    tmp = "{}.{}.{}.tmp".format(path, socket.gethostname(), os.getpid())
+    with open(tmp, 'w') as fout:
+        json.dump(data, fout)
+    os.replace(tmp, path)
+
+class WorkQueue:
+
+    def __init__(self, path, timeout=300):
+        """
+        path    - shared queue directory
+        timeout - seconds without a heartbeat before a claim is considered dead
+        """
+        self.path = path
+        self.timeout = timeout
+        for name in DIRS:
+            os.makedirs(os.path.join(path, name), exist_ok=True)
+
+    def task_path(self, state, task_id):
+        return os.path.join(self.path, state, task_id + ".json")
+
+    def submit(self, tasks):
+        """ Queue tasks, each a JSON-serializable dict with a unique string "id"; already submitted ids are skipped """
+        submitted = 0
+        for task in tasks:
+            if any(os.path.exists(self.task_path(state, task["id"])) for state in ["pending", "claimed", "done"]):
+                continue
+            write_atomic(self.task_path("pending", task["id"]), task)
+            submitted += 1
+        return submitted
+
+    def claim(self):
+        """ Atomically take one pending task, or None when there is none """
+        for fname in sorted(os.listdir(os.path.join(self.path, "pending"))):
+            if not fname.endswith(".json"):
+                continue
+            task_id = fname[:-len(".json")]
+            try:
+                os.rename(self.task_path("pending", task_id), self.task_path("claimed", task_id))
+            except FileNotFoundError:
+                # another worker was faster
+                continue
+            self.heartbeat(task_id)
+            with open(self.task_path("claimed", task_id), 'r') as fin:
+                return json.load(fin)
+        return None
+
+    def heartbeat(self, task_id):
+        try:
+            os.utime(self.task_path("claimed", task_id))
+        except FileNotFoundError:
+            pass
+
+    def complete(self, task_id, result):
+        """ Store a task's result and retire it """
+        write_atomic(self.task_path("results", task_id), result)
+        try:
+            os.rename(self.task_path("claimed", task_id), self.task_path("done", task_id))
+        except FileNotFoundError:
+            # requeued while we were running: the result is in, so drop the duplicate
+            try:
+                os.rename(self.task_path("pending", task_id), self.task_path("done", task_id))
+            except FileNotFoundError:
+                pass
+
+    def now(self):
+        """ Current time as the shared filesystem stamps it (the clock heartbeat mtimes come from) """
+        probe = os.path.join(self.path, "probe.{}.{}".format(socket.gethostname(), os.getpid()))
+        with open(probe, 'w'):
+            pass
+        try:
+            return os.path.getmtime(probe)
+        finally:
+            os.remove(probe)
+
+    def requeue_stale(self):
+        """ Move claims without a recent heartbeat back to pending, returns how many """
+        requeued = 0
+        now = self.now()
+        for fname in os.listdir(os.path.join(self.path, "claimed")):
+            if not fname.endswith(".json"):
+                continue
+            task_id = fname[:-len(".json")]
+            try:
+                if now - os.path.getmtime(self.task_path("claimed", task_id)) > self.timeout:
+                    os.rename(self.task_path("claimed", task_id), self.task_path("pending", task_id))
+                    requeued += 1
+            except FileNotFoundError:
+                continue
+        return requeued
+
+    def status(self):
+        """ Number of tasks in each state """
+        return {name: len([fname for fname in os.listdir(os.path.join(self.path, name)) if fname.endswith(".json")]) for name in DIRS}
+
+    def results(self):
+        """ Every stored result, in task id order """
+        results = []
+        for fname in sorted(os.listdir(os.path.join(self.path, "results"))):
+            if fname.endswith(".json"):
+                with open(os.path.join(self.path, "results", fname), 'r') as fin:
+                    results.append(json.load(fin))
+        return results
+
+    def work(self, handler, poll=1.0, wait=False):
+        """
+        Worker loop: claim tasks and store {"id", "worker", "ok", "result" or "error"}
+        handler - function(task) -> JSON-serializable result
+        poll    - seconds between polls while other workers still hold claims
+        wait    - keep polling for new tasks when the queue is empty
+        Returns the number of tasks run
+        """
+        worker = "{}:{}".format(socket.gethostname(), os.getpid())
+        runs = 0
+        while True:
+            self.requeue_stale()
+            task = self.claim()
+            if task is None:
+                if wait or self.status()["claimed"] > 0:
+                    # claims of dead workers come back once their heartbeat times out
+                    time.sleep(poll)
+                    continue
+                return runs
+
+            stop = threading.Event()
+            def beat():
+                while not stop.wait(self.timeout / 4):
+                    self.heartbeat(task["id"])
+            beater = threading.Thread(target=beat, daemon=True)
+            beater.start()
+            try:
+                result = {"id": task["id"], "worker": worker, "ok": True, "result": handler(task)}
+            except Exception as e:
+                result = {"id": task["id"], "worker": worker, "ok": False, "error": "{}: {}".format(type(e).__name__, e)}
+            finally:
+                stop.set()
+                beater.join()
+            self.complete(task["id"], result)
+            runs += 1
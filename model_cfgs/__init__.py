@@ -0,0 +1,11 @@
+"""
+File:     __init__.py
+Desc:     Parametric model generators, producing config rows in memory
+          (convert them with PhotonicAccelerator.layer_table)
+"""
+
+from model_cfgs.generate_ResNet50 import resnet50
+from model_cfgs.generate_YOLOv3 import yolov3
+
+# name -> generator(startingH, startingW, width_mult)
+GENERATORS = {"ResNet50": resnet50, "YOLOv3": yolov3}
@@ -1,88 +1,113 @@
 # File:    generate_ResNet50.py
 # Author:  Edward Hanson (edward.t.hanson@duke.edu)
-# Desc.    Generate ResNet50 config file
+# Desc.    Generate ResNet50 config rows, in memory (resnet50()) or as a config file
+# Usage:   python generate_ResNet50.py --height 1254 --width 1254 --width-mult 0.5
+
+import argparse
 
 startingH = 224 #1254 #1225 #256
 startingW = 224 #1254 #1225 #256
 
+HEADER = ["Layer name", "IFMAP Height", "IFMAP Width", "Filter Height", "Filter Width", "Channels", "Num Filter", "Strides"]
+
 def appendToFile(fp, name, H, W, KH, KW, IC, OC, stride):
     fp.write(str(name)+",\t" + str(H)+",\t" + str(W)+",\t" + str(KH)+",\t" + str(KW)+",\t" + str(IC)+",\t" + str(OC)+",\t" + str(stride)+",\n")
 
+def write_csv(rows, path):
+    """ Write config rows as a model config file """
+    fp = open(path, "w")
+    appendToFile(fp, *HEADER)
+    for row in rows:
+        appendToFile(fp, *row)
+    fp.close()
+
 def update(nextC, layerNum):
     curC = nextC
     layerNum += 1
     return curC, layerNum
 
-def block(fp, layerNum, curH, curW, curC, midC, lastC, first=False, downsample=False):
+def scale(channels, width_mult):
+    return max(1, int(channels * width_mult))
+
+def block(rows, layerNum, curH, curW, curC, midC, lastC, first=False, downsample=False):
     if first:
         residC = curC
         residH = curH
         residW = curW
-        
+
     if first and downsample:
         initial_stride = 2
     else:
         initial_stride = 1
-    
+
     # bottleneck
     nextC = midC
-    appendToFile(fp, "Conv"+str(layerNum), curH, curW, 1, 1, curC, nextC, initial_stride)
+    rows.append(["Conv"+str(layerNum), curH, curW, 1, 1, curC, nextC, initial_stride])
     curC, layerNum = update(nextC, layerNum)
 
     if first and downsample:
         curH = curH // 2
         curW = curW // 2
-    
+
     # 3x3 conv
     nextC = midC
-    appendToFile(fp, "Conv"+str(layerNum), curH, curW, 3, 3, curC, nextC, 1)
+    rows.append(["Conv"+str(layerNum), curH, curW, 3, 3, curC, nextC, 1])
     curC, layerNum = update(nextC, layerNum)
 
     # bottleneck
     nextC = lastC
-    appendToFile(fp, "Conv"+str(layerNum), curH, curW, 1, 1, curC, nextC, 1)
+    rows.append(["Conv"+str(layerNum), curH, curW, 1, 1, curC, nextC, 1])
     curC, layerNum = update(nextC, layerNum)
 
     if first:
         nextC = lastC
         # residual output
-        appendToFile(fp, "Resid"+str(layerNum), residH, residW, 1, 1, residC, nextC, initial_stride)
+        rows.append(["Resid"+str(layerNum), residH, residW, 1, 1, residC, nextC, initial_stride])
         _, layerNum = update(nextC, layerNum)
-    
+
     return layerNum, curC, curH, curW
 
-def gen_yolov3():
+def resnet50(startingH=startingH, startingW=startingW, width_mult=1.0):
+    """
+    ResNet50 config rows [name, H, W, KH, KW, C, N, S] for an input resolution
+    width_mult - scales every stage's channel count
+    """
+    rows = []
     curH = startingH
     curW = startingW
     curC = 3
     layerNum = 1
-    
-    fp = open("ResNet50.csv", "w")
-    appendToFile(fp, "Layer name", "IFMAP Height", "IFMAP Width", "Filter Height", "Filter Width", "Channels", "Num Filter", "Strides")
-    
+
     # 1
-    nextC = 64
-    appendToFile(fp, "Conv"+str(layerNum), curH, curW, 7, 7, curC, nextC, 2)
+    nextC = scale(64, width_mult)
+    rows.append(["Conv"+str(layerNum), curH, curW, 7, 7, curC, nextC, 2])
     curH = curH // 4
     curW = curW // 4
     curC, layerNum = update(nextC, layerNum)
-    
+
     # block 2
     for i in range(3):
-        layerNum, curC, curH, curW = block(fp, layerNum, curH, curW, curC, 64, 256, first=(i==0), downsample=False)
+        layerNum, curC, curH, curW = block(rows, layerNum, curH, curW, curC, scale(64, width_mult), scale(256, width_mult), first=(i==0), downsample=False)
 
     # block 3
     for i in range(4):
-        layerNum, curC, curH, curW = block(fp, layerNum, curH, curW, curC, 128, 512, first=(i==0), downsample=True)
+        layerNum, curC, curH, curW = block(rows, layerNum, curH, curW, curC, scale(128, width_mult), scale(512, width_mult), first=(i==0), downsample=True)
 
     # block 4
     for i in range(6):
-        layerNum, curC, curH, curW = block(fp, layerNum, curH, curW, curC, 256, 1024, first=(i==0), downsample=True)
+        layerNum, curC, curH, curW = block(rows, layerNum, curH, curW, curC, scale(256, width_mult), scale(1024, width_mult), first=(i==0), downsample=True)
 
     # block 5
     for i in range(3):
-        layerNum, curC, curH, curW = block(fp, layerNum, curH, curW, curC, 512, 2048, first=(i==0), downsample=True)
+        layerNum, curC, curH, curW = block(rows, layerNum, curH, curW, curC, scale(512, width_mult), scale(2048, width_mult), first=(i==0), downsample=True)
 
-    fp.close()
-    
-gen_yolov3()
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate ResNet50 config file")
+    parser.add_argument("--height", type=int, default=startingH, help="Input height")
+    parser.add_argument("--width", type=int, default=startingW, help="Input width")
+    parser.add_argument("--width-mult", type=float, default=1.0, help="Channel width multiplier")
+    parser.add_argument("--output", type=str, default="ResNet50.csv", help="Output config file")
+    args = parser.parse_args()
+    write_csv(resnet50(args.height, args.width, args.width_mult), args.output)
@@ -1,89 +1,111 @@
 # File:    generate_YOLOv3.py
 # Author:  Edward Hanson (edward.t.hanson@duke.edu)
-# Desc.    Generate YOLOv3 (Darknet-53) config file
+# Desc.    Generate YOLOv3 (Darknet-53) config rows, in memory (yolov3()) or as a config file
+# Usage:   python generate_YOLOv3.py --height 1225 --width 1225 --width-mult 0.5
+
+import argparse
 
 startingH = 1024 #1225 #256
 startingW = 1024 #1225 #256
 
+HEADER = ["Layer name", "IFMAP Height", "IFMAP Width", "Filter Height", "Filter Width", "Channels", "Num Filter", "Strides"]
+
 def appendToFile(fp, name, H, W, KH, KW, IC, OC, stride):
     fp.write(str(name)+",\t" + str(H)+",\t" + str(W)+",\t" + str(KH)+",\t" + str(KW)+",\t" + str(IC)+",\t" + str(OC)+",\t" + str(stride)+",\n")
 
+def write_csv(rows, path):
+    """ Write config rows as a model config file """
+    fp = open(path, "w")
+    appendToFile(fp, *HEADER)
+    for row in rows:
+        appendToFile(fp, *row)
+    fp.close()
+
 def update(nextC, layerNum):
     curC = nextC
     layerNum += 1
     return curC, layerNum
 
-def block(fp, layerNum, curH, curW, curC):
+def block(rows, layerNum, curH, curW, curC):
     residC = curC
 
     # bottleneck
     nextC = curC // 2
-    appendToFile(fp, "Conv"+str(layerNum), curH, curW, 1, 1, curC, nextC, 1)
+    rows.append(["Conv"+str(layerNum), curH, curW, 1, 1, curC, nextC, 1])
     curC, layerNum = update(nextC, layerNum)
 
     # 3x3 conv
     nextC = int(curC * 2)
-    appendToFile(fp, "Conv"+str(layerNum), curH, curW, 3, 3, curC, nextC, 1)
+    rows.append(["Conv"+str(layerNum), curH, curW, 3, 3, curC, nextC, 1])
     curC, layerNum = update(nextC, layerNum)
 
     ## residual output
-    #appendToFile(fp, "Resid"+str(layerNum), curH, curW, 1, 1, residC, nextC, 1)
+    #rows.append(["Resid"+str(layerNum), curH, curW, 1, 1, residC, nextC, 1])
     #_, layerNum = update(nextC, layerNum)
-    
+
     return layerNum, curC
 
-def downsample(fp, layerNum, curH, curW, curC):
+def downsample(rows, layerNum, curH, curW, curC):
     nextC = int(curC * 2)
-    appendToFile(fp, "Conv"+str(layerNum), curH, curW, 3, 3, curC, nextC, 2)
+    rows.append(["Conv"+str(layerNum), curH, curW, 3, 3, curC, nextC, 2])
     curH = int(curH/2)
     curW = int(curW/2)
     curC, layerNum = update(nextC, layerNum)
 
     return layerNum, curH, curW, curC
 
-def gen_yolov3():
+def yolov3(startingH=startingH, startingW=startingW, width_mult=1.0):
+    """
+    YOLOv3 config rows [name, H, W, KH, KW, C, N, S] for an input resolution
+    width_mult - scales the stem's channel count, which every later layer doubles/halves
+    """
+    rows = []
     curH = startingH
     curW = startingW
     curC = 3
     layerNum = 1
-    
-    fp = open("YOLOv3.csv", "w")
-    appendToFile(fp, "Layer name", "IFMAP Height", "IFMAP Width", "Filter Height", "Filter Width", "Channels", "Num Filter", "Strides")
-    
+
     # 1
-    nextC = 32
-    appendToFile(fp, "Conv"+str(layerNum), curH, curW, 3, 3, curC, nextC, 1)
+    nextC = max(2, int(32 * width_mult))
+    rows.append(["Conv"+str(layerNum), curH, curW, 3, 3, curC, nextC, 1])
     curC, layerNum = update(nextC, layerNum)
-    
+
     # 2
-    layerNum, curH, curW, curC = downsample(fp, layerNum, curH, curW, curC)
+    layerNum, curH, curW, curC = downsample(rows, layerNum, curH, curW, curC)
     # block 1
-    layerNum, curC = block(fp, layerNum, curH, curW, curC)
+    layerNum, curC = block(rows, layerNum, curH, curW, curC)
 
     # 3
-    layerNum, curH, curW, curC = downsample(fp, layerNum, curH, curW, curC)
+    layerNum, curH, curW, curC = downsample(rows, layerNum, curH, curW, curC)
     # block 2
     for i in range(2):
-        layerNum, curC = block(fp, layerNum, curH, curW, curC)
+        layerNum, curC = block(rows, layerNum, curH, curW, curC)
 
     # 4
-    layerNum, curH, curW, curC = downsample(fp, layerNum, curH, curW, curC)
+    layerNum, curH, curW, curC = downsample(rows, layerNum, curH, curW, curC)
     # block 3
     for i in range(8):
-        layerNum, curC = block(fp, layerNum, curH, curW, curC)
+        layerNum, curC = block(rows, layerNum, curH, curW, curC)
 
     # 5
-    layerNum, curH, curW, curC = downsample(fp, layerNum, curH, curW, curC)
+    layerNum, curH, curW, curC = downsample(rows, layerNum, curH, curW, curC)
     # block 4
     for i in range(8):
-        layerNum, curC = block(fp, layerNum, curH, curW, curC)
+        layerNum, curC = block(rows, layerNum, curH, curW, curC)
 
     # 6
-    layerNum, curH, curW, curC = downsample(fp, layerNum, curH, curW, curC)
+    layerNum, curH, curW, curC = downsample(rows, layerNum, curH, curW, curC)
     # block 5
     for i in range(4):
-        layerNum, curC = block(fp, layerNum, curH, curW, curC)
+        layerNum, curC = block(rows, layerNum, curH, curW, curC)
 
-    fp.close()
-    
-gen_yolov3()
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate YOLOv3 config file")
+    parser.add_argument("--height", type=int, default=startingH, help="Input height")
+    parser.add_argument("--width", type=int, default=startingW, help="Input width")
+    parser.add_argument("--width-mult", type=float, default=1.0, help="Channel width multiplier")
+    parser.add_argument("--output", type=str, default="YOLOv3.csv", help="Output config file")
+    args = parser.parse_args()
+    write_csv(yolov3(args.height, args.width, args.width_mult), args.output)
@@ -4,13 +4,17 @@ Author:   Edward Hanson (edward.t.hanson@duke.edu)
 Desc:     Runs the PhotonicAccelerator system
 """
 
-from PhotonicAccelerator import PhotonicAccelerator, read_config
+from PhotonicAccelerator import PhotonicAccelerator, read_layers, read_precisions, apply_precisions, precision_search
 import configparser as cp
 import os
 import argparse
 
 parser = argparse.ArgumentParser(description="Neurophos Photonic Subsys")
 parser.add_argument("--config", type=str, default="default.cfg", help="Simulation configuration file, loaded from acc_cfgs/")
+parser.add_argument("--precisions", type=str, default=None, help="Per-layer precision table (Layer name,Nb,MinNb), loaded from model_cfgs/")
+parser.add_argument("--precision-search", action="store_true", help="Run every layer at its lowest-energy supported precision")
+parser.add_argument("--density", type=float, default=None, help="Weight density of layers without a Density column (pruning what-if)")
+parser.add_argument("--structure", type=str, default="unstructured", help="Sparsity structure used with --density: unstructured, block or filter")
 args = parser.parse_args()
 
 def main():
@@ -27,23 +31,24 @@ def main():
     skip_resid = int(config.get("simulation", "skip_resid"))
     
     # load CNN dimensions
-    layer_name, in_obj_size, out_obj_size, in_channels, out_channels, kernel_size, stride = read_config(model_cfg, skip_resid)
-
-    for layer_idx in range(len(layer_name)):
+    layers = read_layers(model_cfg, skip_resid)
+    if args.density is not None:
+        layers = [dict({"density": args.density, "structure": args.structure}, **layer) for layer in layers]
+    if args.precisions is not None:
+        layers = apply_precisions(layers, read_precisions(os.path.join(cwd, "model_cfgs", args.precisions)))
+    if args.precision_search:
+        precisions = [float(Nb) for Nb in config.get("photonic", "precisions", fallback=config.get("photonic", "Nb")).split(',')]
+        layers = precision_search(acc, layers, precisions)
+        for layer in layers:
+            print("{}: \tNb = {}".format(layer["name"], layer["Nb"]))
+
+    for layer in layers:
         if int(config.get("simulation", "dump_layerwise")):
             print()
-            print("Processing layer: {}".format(layer_name[layer_idx]))
-
-        # configure accelerator with current layer dimensions
-        acc.load_layer(in_obj_size[layer_idx], out_obj_size[layer_idx], in_channels[layer_idx], out_channels[layer_idx], kernel_size[layer_idx], stride[layer_idx])
-
-        # update and apply FSM state until 'done' signal is reached
-        acc.update_state(True)
-        cycle = 0
-        while not acc.done:
-            acc.apply_latch()
-            acc.update_state()
-            cycle += 1
+            print("Processing layer: {}".format(layer["name"]))
+
+        # configure accelerator with current layer dimensions and run until 'done' signal is reached
+        cycle = acc.run_layers([layer])[0]
         if int(config.get("simulation", "dump_layerwise")):
             print("Cycle count = {}".format(cycle))
 
@@ -0,0 +1,145 @@
+"""
+File:     serve.py
+Desc:     Persistent simulation service. Keeps PhotonicAccelerator instances warm
+          (keyed by config hash) in a pool of worker processes and serves
+          JSON-lines simulation requests over a Unix socket or stdin/stdout.
+
+Request (one JSON object per line):
+    {"id": 1, "config": "default.cfg", "overrides": {"photonic": {"Nb": 6}},
+     "model_cfg": "YOLOv3.csv", "skip_resid": 0, "traces": false}
+    "layers": [[name, H, W, KH, KW, C, N, S], ...] may replace "model_cfg"; optional fields
+    after S need "columns": their model config headers in order, e.g. ["Groups", "Nb"]
+Response (one JSON object per line, in completion order):
+    {"id": 1, "ok": true, "config_hash": "...", "results": {...}, "layer_names": [...]}
+    {"id": 1, "ok": false, "error": "..."}
+"""
+
+from PhotonicAccelerator import PhotonicAccelerator, read_layers, layer_table, optional_columns, OPTIONAL_COLUMNS
+from SimConfig import apply_overrides, config_hash
+import os
+import sys
+import json
+import functools
+import argparse
+import threading
+import socketserver
+from concurrent.futures import ProcessPoolExecutor
+
+parser = argparse.ArgumentParser(description="Neurophos Photonic simulation service")
+parser.add_argument("--socket", type=str, default=None, help="Unix socket path to listen on (default: serve stdin/stdout)")
+parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of simulation worker processes")
+parser.add_argument("--max-warm", type=int, default=16, help="Warm accelerators kept per worker")
+
+root = os.path.dirname(os.path.abspath(__file__))
+
+# Per-worker cache of warm accelerators, keyed by config hash (insertion order = LRU order)
+_accelerators = {}
+_max_warm = 16
+
+def init_worker(max_warm):
+    global _max_warm
+    _max_warm = max_warm
+    # MemObj resolves mem_cfgs/ and out/ from the working directory
+    os.chdir(root)
+    # keep simulator prints off the response stream
+    sys.stdout = sys.stderr
+
+def get_accelerator(config):
+    key = config_hash(config)
+    if key in _accelerators:
+        _accelerators[key] = _accelerators.pop(key)
+    else:
+        if len(_accelerators) >= _max_warm:
+            _accelerators.pop(next(iter(_accelerators)))
+        _accelerators[key] = PhotonicAccelerator(config)
+    return key, _accelerators[key]
+
+def simulate(request):
+    """ Run one request in a worker process """
+    try:
+        config = apply_overrides(os.path.join(root, "acc_cfgs", request.get("config", "default.cfg")), request.get("overrides", {}))
+        skip_resid = int(request.get("skip_resid", config.get("simulation", "skip_resid")))
+        if "layers" in request:
+            names = request.get("columns", [])
+            unknown = set(names) - set(header for header, key, typ in OPTIONAL_COLUMNS)
+            assert not unknown, "Unknown layer columns: {}".format(", ".join(sorted(unknown)))
+            layers = layer_table(request["layers"], skip_resid, optional_columns([""] * 8 + list(names)))
+        else:
+            model_cfg = request.get("model_cfg", config.get("simulation", "model_cfg"))
+            layers = read_layers(os.path.join(root, "model_cfgs", model_cfg), skip_resid)
+        assert len(layers) > 0, "No supported layers in request"
+
+        key, acc = get_accelerator(config)
+        acc.reset()
+        acc.run_layers(layers)
+        response = {"id": request.get("id"), "ok": True, "config_hash": key, "results": acc.results(),
+                    "layer_names": [layer["name"] for layer in layers]}
+        if request.get("traces", False):
+            response["traces"] = acc.traces()
+        return response
+    except Exception as e:
+        return {"id": request.get("id"), "ok": False, "error": "{}: {}".format(type(e).__name__, e)}
+
+def serve_stream(pool, lines, write):
+    """ Submit every request line to the pool and write responses as they complete """
+    lock = threading.Lock()
+    pending = []
+    def respond(request_id, future):
+        try:
+            line = json.dumps(future.result(), default=float)
+        except Exception as e:
+            # worker crashed or the response could not be transferred: the client still gets an answer
+            line = json.dumps({"id": request_id, "ok": False, "error": "{}: {}".format(type(e).__name__, e)})
+        with lock:
+            write(line + "\n")
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            with lock:
+                write(json.dumps({"id": None, "ok": False, "error": "Bad request: {}".format(e)}) + "\n")
+            continue
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            future = pool.submit(simulate, request)
+        except Exception as e:
+            with lock:
+                write(json.dumps({"id": request_id, "ok": False, "error": "{}: {}".format(type(e).__name__, e)}) + "\n")
+            continue
+        future.add_done_callback(functools.partial(respond, request_id))
+        pending.append(future)
+    for future in pending:
+        future.exception()
+
+def main():
+    args = parser.parse_args()
+    pool = ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(args.max_warm,))
+
+    if args.socket is None:
+        def write(text):
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        serve_stream(pool, sys.stdin, write)
+        pool.shutdown()
+        return
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            lines = (line.decode() for line in self.rfile)
+            serve_stream(pool, lines, lambda text: (self.wfile.write(text.encode()), self.wfile.flush()))
+
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+    server = socketserver.ThreadingUnixStreamServer(args.socket, Handler)
+    print("Serving on {} with {} workers".format(args.socket, args.workers), file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        pool.shutdown()
+        os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, root)
+# MemObj resolves mem_cfgs/ and out/ (and acc_cfgs their cacti path) from the working directory
+os.chdir(root)
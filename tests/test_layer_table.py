@@ -0,0 +1,49 @@
+from PhotonicAccelerator import read_layers, layer_table, optional_columns
+from serve import simulate
+
+def names(layers):
+    return [layer["name"] for layer in layers]
+
+def check_mobilenet(path, count):
+    layers = read_layers(path)
+    assert len(layers) == count
+    # the stem is a dense convolution, every other DSConv row a depthwise + pointwise pair
+    assert "DSConv1" in names(layers)
+    assert not [name for name in names(layers) if name.startswith("DSConv") and name != "DSConv1" and name[-3:] not in ("-dw", "-pw")]
+    for i, layer in enumerate(layers):
+        if layer["name"].endswith("-dw"):
+            pointwise = layers[i + 1]
+            assert pointwise["name"] == layer["name"][:-3] + "-pw"
+            assert layer["groups"] == layer["in_channels"] == layer["out_channels"] == pointwise["in_channels"]
+            assert pointwise["kernel_size"] == 1 and "groups" not in pointwise
+    return layers
+
+def test_mobilenetv2_imagenet_expands():
+    layers = check_mobilenet("model_cfgs/ImageNet/MobileNetV2_ImageNet.csv", 52)
+    dw, pw = layers[1], layers[2]
+    assert (dw["name"], dw["in_channels"], dw["kernel_size"], dw["groups"]) == ("DSConv2-dw", 32, 9, 32)
+    assert (pw["name"], pw["in_channels"], pw["out_channels"]) == ("DSConv2-pw", 32, 16)
+
+def test_mobilenetv2_cifar10_expands():
+    check_mobilenet("model_cfgs/CIFAR10/MobileNetV2_CIFAR10.csv", 53)
+
+def test_resnet152_dsconv_rows_stay_dense():
+    layers = read_layers("model_cfgs/CIFAR10/ResNet152.csv")
+    assert len(layers) == 155
+    assert all("groups" not in layer and not layer["name"].endswith(("-dw", "-pw")) for layer in layers)
+
+def test_headerless_trailing_fields_are_ignored():
+    # 9th field is the "bases" column of the shipped configs, not a group count
+    layers = layer_table([["DSConv3", 34, 34, 3, 3, 64, 64, 1, 5]])
+    assert names(layers) == ["DSConv3"] and "groups" not in layers[0]
+
+def test_explicit_columns():
+    row = ["Conv1", 34, 34, 3, 3, 64, 64, 1, 5, 4, 1]
+    layers = layer_table([row], columns=optional_columns([""] * 8 + ["bases", "Groups", "Separable"]))
+    assert names(layers) == ["Conv1"] and layers[0]["groups"] == 4
+    layers = layer_table([row[:9] + ["", 1]], columns=optional_columns([""] * 8 + ["bases", "Groups", "Separable"]))
+    assert names(layers) == ["Conv1-dw", "Conv1-pw"]
+
+def test_serve_rejects_unknown_columns():
+    response = simulate({"id": 3, "layers": [["Conv1", 34, 34, 3, 3, 64, 64, 1, 5]], "columns": ["bases"]})
+    assert not response["ok"] and "bases" in response["error"]
@@ -0,0 +1,40 @@
+import math
+
+from CactiConfig import CactiConfig
+from MemObj import MemObj
+from MemSurrogate import get_surrogate
+from SimConfig import apply_overrides
+
+SURROGATE = "utils/sweep_data/store"
+
+def buffer(config, name, backend):
+    config = apply_overrides(config, {"memory": {"backend": backend}})
+    ports = float(config.get("memory", name.replace("buffer", "ports")))
+    return MemObj(config, ports, config.get("simulation", "cacti"), config.get("memory", name))
+
+def stats(memobj):
+    return (memobj.latency, memobj.read_energy, memobj.write_energy, memobj.static_power, memobj.area)
+
+def test_store_records_template():
+    assert get_surrogate(SURROGATE).template == CactiConfig("mem_cfgs/SRAM-64MB.cfg").fingerprint()
+
+def test_other_memory_types_do_not_match():
+    surrogate = get_surrogate(SURROGATE)
+    for cfg in ["eDRAM-64MB.cfg", "DRAM-64MB.cfg", "SRAM-64MB-lowP.cfg"]:
+        assert not surrogate.matches(CactiConfig("mem_cfgs/" + cfg).fingerprint())
+    assert not surrogate.matches(None)
+
+def test_edram_buffers_fall_back_to_cacti():
+    for name in ["kernel_buffer", "object_buffer"]:
+        memobj = buffer("acc_cfgs/edrambuffs.cfg", name, "surrogate")
+        assert memobj.backend == "cacti"
+        assert memobj.error is None and not memobj.extrapolated
+        assert stats(memobj) == stats(buffer("acc_cfgs/edrambuffs.cfg", name, "cacti"))
+
+def test_swept_template_uses_surrogate():
+    template = CactiConfig("mem_cfgs/SRAM-64MB.cfg").variant(line_size=100, associativity=2)
+    surrogate = get_surrogate(SURROGATE)
+    assert surrogate.matches(template.fingerprint())
+    result, error, extrapolated = surrogate.predict(*template.params())
+    assert not extrapolated
+    assert all(math.isfinite(value) for value in error.values())
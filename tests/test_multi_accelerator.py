@@ -0,0 +1,27 @@
+import pytest
+
+from MultiAccelerator import MultiAccelerator
+from PhotonicAccelerator import layer_table
+
+ROWS = [["Conv1", 34, 34, 3, 3, 16, 2, 1], ["Conv2", 34, 34, 3, 3, 16, 2, 1], ["Conv3", 34, 34, 3, 3, 16, 32, 1]]
+
+@pytest.fixture(scope="module")
+def multi():
+    return MultiAccelerator("acc_cfgs/default.cfg", chips=8, mode="channels")
+
+def test_identical_shapes_simulate_once(multi):
+    multi.cache.clear()
+    multi.mode = "pipeline"
+    multi.run(layer_table(ROWS))
+    multi.mode = "channels"
+    # Conv1 and Conv2 differ only by name
+    assert len(multi.cache) == 2
+
+def test_idle_chips_only_leak(multi):
+    layer = layer_table(ROWS[:1])[0]
+    result = multi.run([layer])
+    assert result["stages"][0]["chips"] == 2 and result["chips"] == 2
+    latency, chip_energy = multi.layer_cost(multi.split_layer(layer))
+    expected = chip_energy * 2 + multi.idle_power() * latency * 6 + result["link_energy"]
+    assert result["energy"] == pytest.approx(expected)
+    assert multi.idle_power() < chip_energy / latency
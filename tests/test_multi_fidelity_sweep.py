@@ -0,0 +1,23 @@
+import os
+
+from CactiConfig import CactiConfig
+from MultiFidelitySweep import MultiFidelitySweep
+from SimConfig import apply_overrides
+
+def sweep(tmp_path, monkeypatch, buffers):
+    config = apply_overrides("acc_cfgs/default.cfg", {"memory": {"surrogate": os.path.abspath("utils/sweep_data/store")}})
+    os.makedirs(str(tmp_path / "mem_cfgs"))
+    CactiConfig("mem_cfgs/SRAM-64MB.cfg").variant(line_size=100, associativity=2).write(str(tmp_path / "mem_cfgs" / "SRAM-swept.cfg"))
+    for cfg in ["SRAM-64MB.cfg", "eDRAM-64MB.cfg"]:
+        CactiConfig("mem_cfgs/" + cfg).write(str(tmp_path / "mem_cfgs" / cfg))
+    monkeypatch.chdir(str(tmp_path))
+    return MultiFidelitySweep(config, [], {("memory", "kernel_buffer"): buffers, ("memory", "object_buffer"): ["SRAM-swept.cfg"]})
+
+def test_swept_buffers_are_covered(tmp_path, monkeypatch):
+    assert sweep(tmp_path, monkeypatch, ["SRAM-swept.cfg"]).surrogate_in_range()
+
+def test_other_memory_types_are_not_covered(tmp_path, monkeypatch):
+    assert not sweep(tmp_path, monkeypatch, ["SRAM-swept.cfg", "eDRAM-64MB.cfg"]).surrogate_in_range()
+
+def test_buffers_outside_the_sweep_are_not_covered(tmp_path, monkeypatch):
+    assert not sweep(tmp_path, monkeypatch, ["SRAM-swept.cfg", "SRAM-64MB.cfg"]).surrogate_in_range()
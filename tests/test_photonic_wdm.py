@@ -0,0 +1,29 @@
+import pytest
+
+from PhotonicAccelerator import PhotonicAccelerator, layer_dims
+from SimConfig import apply_overrides
+
+def accelerator(wdm, engine="fsm"):
+    return PhotonicAccelerator(apply_overrides("acc_cfgs/default.cfg", {"photonic": {"wdm": wdm}, "simulation": {"engine": engine}}))
+
+def photonic_energy(acc, fft_convs, obj_fft_convs):
+    return acc.layer_energies(0, fft_convs, obj_fft_convs, 0, 0, 0)[1]
+
+def test_object_ffts_do_not_scale_with_wdm():
+    single, multi = accelerator(1), accelerator(4)
+    # state 2 only: two object FFTs per input pass
+    assert photonic_energy(multi, 2, 2) == pytest.approx(photonic_energy(single, 2, 2))
+    # kernel convolutions light every wavelength
+    assert photonic_energy(multi, 2, 0) > 3.9 * photonic_energy(single, 2, 0)
+
+def test_state2_energy_per_layer_independent_of_wdm():
+    energies = []
+    for wdm in [1, 2, 4]:
+        acc = accelerator(wdm)
+        acc.run_layers([dict(zip(["in_obj_size", "out_obj_size", "in_channels", "out_channels", "kernel_size", "stride"],
+                                 layer_dims(34, 34, 3, 3, 64, 64, 1)))])
+        in_passes = -(-acc.in_limit // acc.channels_per_map)
+        assert acc.total_obj_fft_convs[0] == 2 * in_passes
+        kernel_energy = (acc.total_fft_convs[0] - acc.total_obj_fft_convs[0]) * acc.photonic.E
+        energies.append(acc.photonic_energy[0] - kernel_energy)
+    assert energies == pytest.approx([energies[0]] * 3)
@@ -0,0 +1,25 @@
+import pytest
+
+from PhotonicAccelerator import PhotonicAccelerator, layer_dims
+from Roofline import Roofline
+from SimConfig import apply_overrides
+
+LAYERS = [(226, 226, 3, 3, 3, 32, 1), (16, 16, 3, 3, 512, 512, 1), (58, 58, 1, 1, 128, 256, 1)]
+
+def simulate(Nb=None):
+    acc = PhotonicAccelerator(apply_overrides("acc_cfgs/default.cfg", {}))
+    keys = ["in_obj_size", "out_obj_size", "in_channels", "out_channels", "kernel_size", "stride"]
+    acc.run_layers([dict(zip(keys, layer_dims(*dims)), Nb=Nb) for dims in LAYERS])
+    return acc
+
+def test_photonic_and_adda_ceilings_follow_their_own_work():
+    roofline = Roofline(simulate())
+    ratios = [times["adda"] / times["photonic"] for times in map(roofline.ceiling_times, range(len(LAYERS)))]
+    # exposures and conversions scale differently with the layer shape
+    assert max(ratios) > 2 * min(ratios)
+
+def test_buffer_bytes_independent_of_layer_precision():
+    reference, low = Roofline(simulate()), Roofline(simulate(Nb=4))
+    for i in range(len(LAYERS)):
+        assert low.buffer_bytes(i) == pytest.approx(reference.buffer_bytes(i))
+        assert low.ceiling_times(i)["buffer"] == pytest.approx(reference.ceiling_times(i)["buffer"])
@@ -0,0 +1,31 @@
+import json
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+from serve import serve_stream
+
+class FailingPool:
+    """ Pool whose workers always die """
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+class BrokenPool:
+    """ Pool that cannot accept work any more """
+    def submit(self, fn, *args):
+        raise BrokenProcessPool("pool is broken")
+
+def responses(pool, requests):
+    out = []
+    serve_stream(pool, [json.dumps(request) for request in requests], out.append)
+    return [json.loads(line) for line in out]
+
+def test_worker_failure_answers_every_request():
+    answers = responses(FailingPool(), [{"id": 1}, {"id": "b"}])
+    assert sorted(str(answer["id"]) for answer in answers) == ["1", "b"]
+    assert all(not answer["ok"] and "BrokenProcessPool" in answer["error"] for answer in answers)
+
+def test_broken_pool_answers_every_request():
+    answers = responses(BrokenPool(), [{"id": 7}])
+    assert answers == [{"id": 7, "ok": False, "error": "BrokenProcessPool: pool is broken"}]
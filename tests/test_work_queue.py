@@ -0,0 +1,27 @@
+import os
+import time
+
+import WorkQueue as work_queue
+from WorkQueue import WorkQueue
+
+def claimed_queue(tmp_path, timeout=60):
+    queue = WorkQueue(str(tmp_path), timeout)
+    queue.submit([{"id": "task"}])
+    assert queue.claim()["id"] == "task"
+    return queue
+
+def test_live_claim_survives_local_clock_skew(tmp_path, monkeypatch):
+    queue = claimed_queue(tmp_path)
+    # this node's clock runs ahead of the file server by more than the timeout
+    skewed = time.time() + 10 * queue.timeout
+    monkeypatch.setattr(work_queue.time, "time", lambda: skewed)
+    assert queue.requeue_stale() == 0
+    assert queue.status()["claimed"] == 1
+
+def test_dead_claim_is_requeued(tmp_path):
+    queue = claimed_queue(tmp_path)
+    stale = os.path.getmtime(queue.task_path("claimed", "task")) - 2 * queue.timeout
+    os.utime(queue.task_path("claimed", "task"), (stale, stale))
+    assert queue.requeue_stale() == 1
+    assert queue.status() == {"pending": 1, "claimed": 0, "done": 0, "results": 0}
+    assert sorted(os.listdir(str(tmp_path))) == sorted(work_queue.DIRS)
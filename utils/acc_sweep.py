@@ -0,0 +1,112 @@
+"""
+File:     acc_sweep.py
+Desc:     Accelerator-config sweep (acc_cfgs overrides x models) distributed over a
+          shared-directory work queue (see WorkQueue). Start workers on any number of
+          nodes sharing the queue directory; results are consolidated into one CSV.
+Usage:    python utils/acc_sweep.py --queue /shared/q --submit --grid photonic.MS_pix=4e6,9e6 --grid memory.mem_access_width=64,128 --models YOLOv3.csv ResNet50.csv
+          python utils/acc_sweep.py --queue /shared/q --workers 8
+          python utils/acc_sweep.py --queue /shared/q --consolidate out/acc_sweep.csv
+"""
+
+import os
+import sys
+import csv
+import json
+import hashlib
+import argparse
+import itertools
+from multiprocessing import Process
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(root)
+os.chdir(root) # MemObj resolves mem_cfgs/ and out/ from the working directory
+from WorkQueue import WorkQueue
+from WhatIf import parse_param
+import serve
+
+parser = argparse.ArgumentParser(description="Distributed accelerator-config sweep")
+parser.add_argument("--queue", type=str, required=True, help="Shared work queue directory")
+parser.add_argument("--config", type=str, default="default.cfg", help="Base simulation configuration file, loaded from acc_cfgs/")
+parser.add_argument("--submit", action="store_true", help="Queue every grid point x model")
+parser.add_argument("--grid", type=str, action="append", default=[], help="section.option=v1,v2,... (repeat for a Cartesian grid)")
+parser.add_argument("--models", type=str, nargs='+', default=None, help="Model configs, loaded from model_cfgs/ (default: from config)")
+parser.add_argument("--workers", type=int, default=0, help="Number of local worker processes")
+parser.add_argument("--timeout", type=float, default=300, help="Seconds without a heartbeat before a point is re-queued")
+parser.add_argument("--consolidate", type=str, default=None, help="Write every result to this CSV file")
+parser.add_argument("--partial", action="store_true", help="Consolidate even while points are still pending or running")
+
+def simulate(task):
+    """ Worker handler: one serve.py request, with warm accelerators reused across tasks """
+    response = serve.simulate(task["request"])
+    if not response["ok"]:
+        raise RuntimeError(response["error"])
+    # results carry their request, so consolidation never depends on where the task file is
+    return {"request": task["request"], "results": response["results"]}
+
+def run_worker(queue_path, timeout):
+    serve.init_worker(serve._max_warm)
+    WorkQueue(queue_path, timeout).work(simulate)
+
+def tasks(config, grid, models):
+    """ One task per grid point and model, with a stable id so resubmitting skips queued points """
+    params = list(grid)
+    for values in itertools.product(*[grid[param] for param in params]):
+        overrides = {}
+        for (section, option), value in zip(params, values):
+            overrides.setdefault(section, {})[option] = value
+        for model in models:
+            request = {"config": config, "overrides": overrides}
+            if model is not None:
+                request["model_cfg"] = model
+            task_id = hashlib.sha1(json.dumps(request, sort_keys=True).encode()).hexdigest()[:16]
+            yield {"id": task_id, "request": request}
+
+def consolidate(queue, path):
+    """ All results in one CSV: overrides, model, then every results() stat """
+    rows = []
+    for result in queue.results():
+        if not result["ok"]:
+            print("Warn: sweep point {} failed ({}). Skipping datapoint".format(result["id"], result["error"]))
+            continue
+        request = result["result"]["request"]
+        point = {"{}.{}".format(section, option): value for section, options in request["overrides"].items() for option, value in options.items()}
+        point["model"] = request.get("model_cfg", "")
+        rows.append((point, result["result"]["results"]))
+    params = sorted(set(name for point, stats in rows for name in point if name != "model"))
+    stats = list(rows[0][1]) if rows else []
+    with open(path, 'w', newline='') as fp:
+        write = csv.writer(fp)
+        write.writerow(params + ["model"] + stats)
+        for point, result in rows:
+            write.writerow([point.get(name, "") for name in params] + [point["model"]] + [result[name] for name in stats])
+    print("Wrote {} sweep points to {}".format(len(rows), path))
+
+def main():
+    args = parser.parse_args()
+    queue = WorkQueue(args.queue, args.timeout)
+    if args.submit:
+        grid = {}
+        for spec in args.grid:
+            param, values = spec.split('=', 1)
+            grid[parse_param(param)] = [value.strip() for value in values.split(',')]
+        all_tasks = list(tasks(args.config, grid, args.models if args.models is not None else [None]))
+        print("Queued {} of {} sweep points".format(queue.submit(all_tasks), len(all_tasks)))
+
+    workers = [Process(target=run_worker, args=(args.queue, args.timeout)) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    status = queue.status()
+    print("Queue: {} pending, {} running, {} done".format(status["pending"], status["claimed"], status["done"]))
+
+    if args.consolidate is not None:
+        if status["pending"] + status["claimed"] > 0:
+            if not args.partial:
+                print("Error: {} sweep points not finished, not consolidating (use --partial to write them anyway)".format(status["pending"] + status["claimed"]))
+                sys.exit(1)
+            print("Warn: {} sweep points not finished, writing a partial results file".format(status["pending"] + status["claimed"]))
+        consolidate(queue, args.consolidate)
+
+if __name__ == "__main__":
+    main()
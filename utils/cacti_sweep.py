@@ -1,9 +1,29 @@
+# Usage: python cacti_sweep.py                         (run the sweep below in this process)
+#        python cacti_sweep.py --queue DIR --submit      (queue every sweep point in a shared directory)
+#        python cacti_sweep.py --queue DIR --workers 4   (run queued points; start one per node, any number of nodes)
+#        python cacti_sweep.py --queue DIR --consolidate (write the store from every queued result)
+
 import os
 import subprocess
 import time
 import sys
+import argparse
+import itertools
+from multiprocessing import Process
 sys.path.append('../')
 from MemObj import MemObj
+from SweepStore import SweepStore, PARAMS, STATS
+from CactiConfig import CactiConfig
+from WorkQueue import WorkQueue
+
+parser = argparse.ArgumentParser(description="CACTI memory sweep")
+parser.add_argument("--queue", type=str, default=None, help="Shared work queue directory (distributed sweep)")
+parser.add_argument("--submit", action="store_true", help="Queue every sweep point")
+parser.add_argument("--workers", type=int, default=0, help="Number of local worker processes running queued points")
+parser.add_argument("--consolidate", action="store_true", help="Write the sweep store from the queued results")
+parser.add_argument("--partial", action="store_true", help="Consolidate even while points are still pending or running")
+parser.add_argument("--timeout", type=float, default=600, help="Seconds without a heartbeat before a point is re-queued")
+args = parser.parse_args()
 
 # -------- USER PARAMETERS ---------- #
 # Instructions: place all cacti parameters as a list. For visualization, restrict sweeps to 2 dimensions.
@@ -15,7 +35,9 @@ golden_config_path = os.path.join(cwd, "../mem_cfgs/SRAM-64MB.cfg")
 cacti_path = os.path.join(cwd, "../../cacti/")
 dump_path = os.path.join(cwd, "sweep_data/")
 summary_path = os.path.join(cwd, "sweep_data/summary.csv")
-dump_all = True # generate all cacti config files for this sweep?
+store_path = os.path.join(cwd, "sweep_data/store")
+dump_all = False # archive all generated cacti config files for this sweep? (otherwise configs stay in memory)
+dump_csv = False # also write the legacy tab-separated summary.csv?
 
 size = [67108864] # bytes
 #line_size = [1024] # bytes
@@ -28,39 +50,6 @@ temp = [360]
 
 # ----------------------------------- #
 
-# Create and generate new cacti config
-def gen_cfg(golden_config_path, new_config_path, size, line_size, associativity, banks, technode, temp):
-    fin = open(golden_config_path, "r")
-    towrite = ""
-    for line in fin:
-        line_split = line.split(' ')
-        if len(line) < 3:
-            towrite += line
-        elif line[0] == '/' and line[1] == '/':
-            continue
-        elif line[0] == '#':
-            towrite += line
-        elif line_split[0].strip() == "-size":
-            towrite += ("-size (bytes) " + str(size) + "\n")
-        elif line_split[0].strip() == "-block":
-            towrite += ("-block size (bytes) " + str(line_size) + "\n")
-        elif line_split[0].strip() == "-output/input":
-            towrite += ("-output/input bus width " + str(line_size * 8) + "\n")
-        elif line_split[0].strip() == "-associativity":
-            towrite += ("-associativity " + str(associativity) + "\n")
-        elif line_split[0].strip() == "-UCA":
-            towrite += ("-UCA bank count " + str(banks) + "\n")
-        elif line_split[0].strip() == "-technology":
-            towrite += ("-technology (u) " + str(technode) + "\n")
-        elif line_split[0].strip() == "-operating":
-            towrite += ("-operating temperature (K) " + str(temp) + "\n")
-        else:
-            towrite += line
-    fin.close()
-    fout = open(new_config_path, "w")
-    fout.write(towrite)
-    fout.close
-
 # Progress bar function
 # update_progress() : Displays or updates a console progress bar
 ## Accepts a float between 0 and 1. Any int will be converted to a float.
@@ -86,32 +75,71 @@ def update_progress(progress):
     sys.stdout.flush()
     
 results = "Size (Bytes),\tLine Size (Bytes),\tAssociativity,\tNum Banks,\tTechnology Node (um),\tOperating Temp (K),\tCycle time (s),\tPer-Byte Read Energy (J),\tPer-Byte Write Energy (J),\tStatic Power (W),\tArea (mm2),\n"
-total_progress = len(size)*len(line_size)*len(associativity)*len(banks)*len(technode)*len(temp)
-i = 0.0
-for s in size:
-    for ls in line_size:
-        for a in associativity:
-            for b in banks:
-                for tec in technode:
-                    for tem in temp:
-                        if dump_all:
-                            cur_cfg = os.path.join(cwd, "sweep_data/SRAM_"+str(s)+"_"+str(ls)+"_"+str(a)+"_"+str(b)+"_"+str(tec)+"_"+str(tem)+".cfg")
-                        else:
-                            cur_cfg = os.path.join(cwd, "sweep_data/SRAM_temp.cfg")
-                        gen_cfg(golden_config_path, cur_cfg, s, ls, a, b, tec, tem)
-                        i += 1
-                        update_progress(i / total_progress)
-                        try:
-                            # Let MemObj do all the work extracting results
-                            memobj = MemObj(os.path.join(cwd, "sweep.cfg"), 1, cacti_path, cur_cfg)
-                            results += str(s)+",\t"+str(ls)+",\t"+str(a)+",\t"+str(b)+",\t"+str(tec)+",\t"+str(tem)+",\t"+str(memobj.latency)+",\t"+str(float(memobj.read_energy) / ls)+",\t"+str(float(memobj.write_energy) / ls)+",\t"+str(memobj.static_power)+",\t"+str(memobj.area)+",\n"
-                            del memobj
-                        except:
-                            print("Warn: config size={}/linesize={}/assoc={}/banks={}/technode={}/temp={} invalid. Skipping datapoint".format(s, ls, a, b, tec, tem))
-                            continue
-                        
-fp = open(summary_path, "w")
-fp.write(results)
-fp.close()
+columns = {name: [] for name in PARAMS + STATS}
+# Parse the golden config once, every sweep point renders from it in memory
+template = CactiConfig(golden_config_path)
+
+def run_point(s, ls, a, b, tec, tem):
+    """ Sweep point [params + stats] (raises on invalid configs) """
+    cur_cfg = template.variant(size=s, line_size=ls, bus_width=ls * 8, associativity=a, banks=b, technode=tec, temp=tem)
+    if dump_all:
+        cur_cfg.write(os.path.join(dump_path, cur_cfg.name() + ".cfg"))
+    # Let MemObj do all the work extracting results
+    memobj = MemObj(os.path.join(cwd, "sweep.cfg"), 1, cacti_path, cur_cfg)
+    return [s, ls, a, b, tec, tem, memobj.latency, float(memobj.read_energy) / ls, float(memobj.write_energy) / ls, memobj.static_power, memobj.area]
+
+def add_point(point):
+    global results
+    results += ",\t".join(str(value) for value in point)+",\n"
+    for name, value in zip(PARAMS + STATS, point):
+        columns[name].append(value)
+
+grid = list(itertools.product(size, line_size, associativity, banks, technode, temp))
+
+def run_worker():
+    WorkQueue(args.queue, args.timeout).work(lambda task: run_point(*task["params"]))
+
+if args.queue is not None:
+    queue = WorkQueue(args.queue, args.timeout)
+    if args.submit:
+        tasks = [{"id": "_".join(str(value) for value in params), "params": list(params)} for params in grid]
+        print("Queued {} of {} sweep points".format(queue.submit(tasks), len(tasks)))
+    workers = [Process(target=run_worker) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    status = queue.status()
+    print("Queue: {} pending, {} running, {} done".format(status["pending"], status["claimed"], status["done"]))
+    if not args.consolidate:
+        sys.exit(0)
+    if status["pending"] + status["claimed"] > 0:
+        if not args.partial:
+            print("Error: {} sweep points not finished, not consolidating (use --partial to write them anyway)".format(status["pending"] + status["claimed"]))
+            sys.exit(1)
+        print("Warn: {} sweep points not finished, writing a partial store".format(status["pending"] + status["claimed"]))
+    for result in queue.results():
+        if result["ok"]:
+            add_point(result["result"])
+        else:
+            print("Warn: sweep point {} invalid ({}). Skipping datapoint".format(result["id"], result["error"]))
+else:
+    total_progress = len(grid)
+    i = 0.0
+    for s, ls, a, b, tec, tem in grid:
+        i += 1
+        update_progress(i / total_progress)
+        try:
+            add_point(run_point(s, ls, a, b, tec, tem))
+        except:
+            print("Warn: config size={}/linesize={}/assoc={}/banks={}/technode={}/temp={} invalid. Skipping datapoint".format(s, ls, a, b, tec, tem))
+            continue
+
+store = SweepStore.write(store_path, columns, template.fingerprint())
+print("Wrote {} sweep points to {}".format(len(store), store_path))
 
-print(results)
+if dump_csv:
+    fp = open(summary_path, "w")
+    fp.write(results)
+    fp.close()
+    print(results)
@@ -0,0 +1,132 @@
+"""
+File:     golden_check.py
+Desc:     Golden-equivalence harness. Runs randomized layers through the
+          cycle-accurate FSM (update_state/apply_latch) and an alternative
+          engine, then diffs every counter, register and traces CSV row.
+Usage:    python utils/golden_check.py --config default.cfg --cases 2000 --engine analytic
+          (--engine also accepts "module:function", called as function(acc) on a loaded layer)
+"""
+
+import os
+import sys
+import io
+import csv
+import math
+import random
+import argparse
+import importlib
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(root)
+os.chdir(root) # MemObj resolves mem_cfgs/ and out/ from the working directory
+from PhotonicAccelerator import PhotonicAccelerator, layer_dims
+
+parser = argparse.ArgumentParser(description="FSM golden-equivalence harness")
+parser.add_argument("--config", type=str, default="default.cfg", help="Simulation configuration file, loaded from acc_cfgs/")
+parser.add_argument("--engine", type=str, default="analytic", help="Engine under test: fsm, analytic, or module:function")
+parser.add_argument("--cases", type=int, default=1000, help="Number of randomized layers")
+parser.add_argument("--seed", type=int, default=0, help="Random seed")
+parser.add_argument("--max-channels", type=int, default=64, help="Upper bound on in/out channels (FSM cost grows with their product)")
+
+# FSM registers and per-layer counters compared after every layer
+REGISTERS = ["cycle", "state", "done", "curr_in_channel", "curr_out_channel", "channels_per_map", "filters_per_map",
+             "groups", "in_limit", "out_limit", "maps_per_exposure", "kern_density", "obj_reads", "kern_reads", "obj_writes", "fft_convs", "obj_fft_convs", "ops"]
+# Lifetime lists compared over the slice each layer appends
+LIFETIME = ["total_latency", "total_cycle", "photonic_energy", "digital_energy", "DAC_energy", "ADC_energy",
+            "obj_energy", "kern_energy", "total_fft_convs", "total_obj_fft_convs", "total_ops", "layerwise_MS_util",
+            "total_obj_reads", "total_kern_reads", "total_obj_writes", "layer_Nb", "obj_inef", "obj_write_inef", "kern_inef"]
+
+def get_engine(name):
+    if name == "fsm":
+        return PhotonicAccelerator.simulate_fsm
+    if name == "analytic":
+        return PhotonicAccelerator.simulate_analytic
+    module, func = name.split(':')
+    return getattr(importlib.import_module(module), func)
+
+def random_layer(rng, MS_pix, max_channels):
+    """ Random model config row, group count and sparsity, WDM degree and an odd memory access width """
+    kh = rng.choice([1, 3, 5, 7])
+    kw = kh if rng.random() < 0.8 else rng.choice([1, 3, 5, 7])
+    s = rng.choice([1, 1, 2, 3])
+    # object size relative to the metasurface, from tiny to larger than MS_pix
+    target = MS_pix * 10**rng.uniform(-5, 0.5)
+    aspect = 2**rng.uniform(-1, 1)
+    h = max((kh // 2) * 2 + 1, int(math.sqrt(target * aspect)))
+    w = max((kw // 2) * 2 + 1, int(target / h))
+    c = int(2**rng.uniform(0, math.log2(max_channels)))
+    n = int(2**rng.uniform(0, math.log2(max_channels)))
+    mode = rng.random()
+    if mode < 0.15:
+        # depthwise, with a channel multiplier
+        groups = c
+        n = c * rng.choice([1, 1, 2])
+    elif mode < 0.3:
+        # grouped
+        groups = rng.choice([2, 4, 8])
+        c = groups * max(1, c // groups)
+        n = groups * max(1, n // groups)
+    else:
+        groups = 1
+    sparsity = {}
+    if rng.random() < 0.3:
+        sparsity = {"density": rng.uniform(0.05, 1), "structure": rng.choice(["unstructured", "block", "filter"])}
+    wdm = rng.choice([1, 1, 2, 3, 4, 8])
+    mem_access_width = float(2 * rng.randint(0, 2047) + 1)
+    return [h, w, kh, kw, c, n, s], dict(groups=groups, **sparsity), wdm, mem_access_width
+
+def traces_csv(acc):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(acc.traces())
+    return buf.getvalue().splitlines()
+
+def main():
+    args = parser.parse_args()
+    config_path = os.path.join(root, "acc_cfgs", args.config)
+    engine = get_engine(args.engine)
+    rng = random.Random(args.seed)
+
+    ref = PhotonicAccelerator(config_path)
+    alt = PhotonicAccelerator(config_path)
+
+    mismatches = 0
+    for case in range(args.cases):
+        row, options, wdm, mem_access_width = random_layer(rng, ref.MS_pix, args.max_channels)
+        offsets = [len(getattr(ref, name)) for name in LIFETIME]
+        for acc in (ref, alt):
+            acc.mem_access_width = mem_access_width
+            acc.wdm = wdm
+            acc.load_layer(*layer_dims(*row), **options)
+        ref_iters = ref.simulate_fsm()
+        alt_iters = engine(alt)
+
+        diffs = []
+        if alt_iters is not None and alt_iters != ref_iters:
+            diffs.append("iterations: {} != {}".format(ref_iters, alt_iters))
+        for name in REGISTERS:
+            if getattr(ref, name) != getattr(alt, name):
+                diffs.append("{}: {} != {}".format(name, getattr(ref, name), getattr(alt, name)))
+        for name, offset in zip(LIFETIME, offsets):
+            if getattr(ref, name)[offset:] != getattr(alt, name)[offset:]:
+                diffs.append("{}: {} != {}".format(name, getattr(ref, name)[offset:][:4], getattr(alt, name)[offset:][:4]))
+        if diffs:
+            mismatches += 1
+            print("Case {} {} {} wdm={} mem_access_width={}".format(case, row, options, wdm, mem_access_width))
+            for diff in diffs:
+                print("\t" + diff)
+
+    ref_rows = traces_csv(ref)
+    alt_rows = traces_csv(alt)
+    for ref_row, alt_row in zip(ref_rows, alt_rows):
+        if ref_row != alt_row:
+            mismatches += 1
+            print("Traces row differs: {}".format(ref_row.split(',')[0]))
+    if len(ref_rows) != len(alt_rows):
+        mismatches += 1
+        print("Traces row count differs: {} != {}".format(len(ref_rows), len(alt_rows)))
+
+    print("{} cases, {} mismatches".format(args.cases, mismatches))
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
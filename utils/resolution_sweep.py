@@ -0,0 +1,60 @@
+"""
+File:     resolution_sweep.py
+Desc:     Input resolution x width multiplier x hardware sweep. Model layers come
+          straight from the generators in model_cfgs/ (no config files written or
+          parsed) and hardware stats are reused across points (see WhatIf).
+Usage:    python utils/resolution_sweep.py --model ResNet50 --resolutions 224 256 1225 1254 --width-mults 1 0.5
+          python utils/resolution_sweep.py --model YOLOv3 --resolutions 256 1024 --sweep photonic.MS_pix 4e6 9e6
+"""
+
+import os
+import sys
+import csv
+import argparse
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(root)
+os.chdir(root) # MemObj resolves mem_cfgs/ and out/ from the working directory
+from PhotonicAccelerator import layer_table
+from WhatIf import WhatIf, parse_param
+from model_cfgs import GENERATORS
+
+parser = argparse.ArgumentParser(description="Input resolution and hardware sweep")
+parser.add_argument("--config", type=str, default="default.cfg", help="Simulation configuration file, loaded from acc_cfgs/")
+parser.add_argument("--model", type=str, default="ResNet50", choices=sorted(GENERATORS), help="Model generator")
+parser.add_argument("--resolutions", type=int, nargs='+', required=True, help="Square input resolutions")
+parser.add_argument("--width-mults", type=float, nargs='+', default=[1.0], help="Channel width multipliers")
+parser.add_argument("--sweep", type=str, nargs='+', default=None, help="section.option followed by the hardware values to evaluate")
+parser.add_argument("--output", type=str, default=None, help="CSV file for the results")
+
+def main():
+    args = parser.parse_args()
+    whatif = WhatIf(os.path.join(root, "acc_cfgs", args.config), [])
+    skip_resid = int(whatif.config.get("simulation", "skip_resid"))
+    if args.sweep is None:
+        param, values = None, [None]
+    else:
+        param, values = parse_param(args.sweep[0]), args.sweep[1:]
+
+    results = []
+    for value in values:
+        if param is not None:
+            whatif.set(*param, value)
+        for resolution in args.resolutions:
+            for width_mult in args.width_mults:
+                rows = GENERATORS[args.model](resolution, resolution, width_mult)
+                whatif.set_layers(layer_table(rows, skip_resid))
+                result = whatif.evaluate()
+                results.append([value, resolution, width_mult, result["latency"], result["energy"], result["TOPS"], result["TOPS/W"]])
+                print("{} {}x{} x{}: \tlatency {} s, energy {} J, TOPS/W {}".format(
+                    "" if param is None else "{}={}".format(args.sweep[0], value), resolution, resolution, width_mult,
+                    result["latency"], result["energy"], result["TOPS/W"]))
+
+    if args.output is not None:
+        with open(args.output, 'w', newline='') as fp:
+            write = csv.writer(fp)
+            write.writerow(["Hardware value", "Resolution", "Width multiplier", "Latency (s)", "Energy (J)", "TOPS", "TOPS/W"])
+            write.writerows(results)
+
+if __name__ == "__main__":
+    main()
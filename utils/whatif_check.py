@@ -0,0 +1,64 @@
+"""
+File:     whatif_check.py
+Desc:     Incremental what-if check. Applies config changes one after another through
+          WhatIf and compares every results() stat against a fresh PhotonicAccelerator
+          built from the same config, optionally with sparse kernels on every layer.
+Usage:    python utils/whatif_check.py --config default.cfg --density 0.3 --structure unstructured
+          python utils/whatif_check.py --set photonic.Nb=4 --set memory.mem_access_width=128
+"""
+
+import os
+import sys
+import argparse
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(root)
+os.chdir(root) # MemObj resolves mem_cfgs/ and out/ from the working directory
+from PhotonicAccelerator import PhotonicAccelerator, read_layers, SPARSITY_STRUCTURES
+from SimConfig import apply_overrides
+from WhatIf import WhatIf, parse_param
+
+parser = argparse.ArgumentParser(description="WhatIf vs. fresh simulation check")
+parser.add_argument("--config", type=str, default="default.cfg", help="Simulation configuration file, loaded from acc_cfgs/")
+parser.add_argument("--model", type=str, default=None, help="Model config, loaded from model_cfgs/ (default: from config)")
+parser.add_argument("--density", type=float, default=1.0, help="Kernel density of every layer")
+parser.add_argument("--structure", type=str, default="unstructured", choices=SPARSITY_STRUCTURES, help="Sparsity structure of every layer")
+parser.add_argument("--set", type=str, action="append", default=None, help="section.option=value, applied one after another")
+
+# Default changes: one or more per graph node, precision both ways
+CHANGES = ["photonic.Nb=4", "photonic.Nb=8", "photonic.MS_pix=4e6", "photonic.wdm=2", "memory.mem_access_width=128",
+           "memory.leakage_scale=2", "memory.kernel_buffer=SRAM-64MB.cfg", "digital.E_adc=2e-12", "general.en_buffs=0"]
+
+def main():
+    args = parser.parse_args()
+    config = apply_overrides(os.path.join(root, "acc_cfgs", args.config), {})
+    model = args.model if args.model is not None else config.get("simulation", "model_cfg")
+    layers = read_layers(os.path.join(root, "model_cfgs", model), int(config.get("simulation", "skip_resid")))
+    if args.density < 1:
+        layers = [dict(layer, density=args.density, structure=args.structure) for layer in layers]
+
+    whatif = WhatIf(config, layers)
+    whatif.evaluate()
+    mismatches = 0
+    for change in (args.set if args.set is not None else CHANGES):
+        param, value = change.split('=', 1)
+        section, option = parse_param(param)
+        whatif.set(section, option, value)
+        config.set(section, option, value)
+        result = whatif.evaluate()
+
+        acc = PhotonicAccelerator(config)
+        acc.run_layers(layers)
+        fresh = acc.results()
+        diffs = ["{}: {} != {}".format(name, fresh[name], result[name]) for name in fresh if fresh[name] != result[name]]
+        if diffs:
+            mismatches += 1
+            print("{} (recomputed {})".format(change, ", ".join(whatif.recomputed)))
+            for diff in diffs:
+                print("\t" + diff)
+
+    print("{} changes, {} mismatches".format(len(args.set if args.set is not None else CHANGES), mismatches))
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()